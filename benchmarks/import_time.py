@@ -0,0 +1,65 @@
+"""
+Measures how long it takes to import Flask-Pushrod and construct a :class:`~flask.ext.pushrod.Pushrod`, on top of importing Flask itself.
+
+Every measurement runs in a fresh interpreter, since imports are cached after the first time. Usage::
+
+    python benchmarks/import_time.py [--runs 20]
+"""
+
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+
+_measure = """from __future__ import print_function
+import sys, time
+start = time.time()
+import flask
+flask_done = time.time()
+before = set(name for name, module in sys.modules.items() if module is not None)
+%s
+done = time.time()
+after = set(name for name, module in sys.modules.items() if module is not None)
+print(flask_done - start, done - flask_done, ' '.join(sorted(after - before)))
+"""
+
+_scenarios = [
+    ('import flask_pushrod', 'import flask_pushrod'),
+    ('Pushrod()', 'import flask_pushrod; flask_pushrod.Pushrod()'),
+    ('Pushrod(flask.Flask())', 'import flask_pushrod; flask_pushrod.Pushrod(flask.Flask(__name__))'),
+]
+
+
+def measure(code, runs):
+    flask_times = []
+    times = []
+    modules = ''
+
+    for i in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', _measure % code]).decode('utf-8')
+        flask_time, time, modules = output.strip('\n').split(' ', 2)
+        flask_times.append(float(flask_time))
+        times.append(float(time))
+
+    return sorted(flask_times)[runs // 2], sorted(times)[runs // 2], modules.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20, help="interpreters to start per scenario (the median is reported)")
+    parser.add_argument('--modules', action='store_true', help="list the modules imported by each scenario")
+    args = parser.parse_args()
+
+    for name, code in _scenarios:
+        flask_time, time, modules = measure(code, args.runs)
+        print("%-24s %7.2f ms (flask itself: %.2f ms, %i new modules)" % (name, time * 1000, flask_time * 1000, len(modules)))
+
+        if args.modules:
+            for module in modules:
+                print("    %s" % module)
+
+
+if __name__ == '__main__':
+    main()
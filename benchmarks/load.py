@@ -0,0 +1,261 @@
+"""
+Drives Pushrod apps in-process through their WSGI interface and reports throughput, latency percentiles and peak RSS for each renderer and payload shape.
+
+The payloads come from the pushrodr example (backed by a temporary SQLite database), and from synthetic generators. Every scenario runs in a fresh interpreter, so that the peak RSS of one scenario doesn't leak into the next. Usage::
+
+    python benchmarks/load.py [--duration 5] [--concurrency 4] [--renderers json,html] [--shapes ...]
+"""
+
+from __future__ import print_function
+
+from werkzeug.test import EnvironBuilder
+
+from StringIO import StringIO
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: The MIME type requested for each renderer name.
+renderer_mime_types = {
+    'json': 'application/json',
+    'html': 'text/html',
+}
+
+
+def pushrodr_app(posts=200, comments=5):
+    """
+    Sets up the last step of the pushrodr example on a temporary SQLite database with ``posts`` posts (spread over a handful of authors), with ``comments`` comments each.
+    """
+
+    sys.path.insert(0, os.path.join(_root, 'examples', 'pushrodr'))
+    import step4 as pushrodr
+
+    handle, path = tempfile.mkstemp(suffix='.db', prefix='pushrodr-load-')
+    os.close(handle)
+
+    app = pushrodr.app
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///%s' % path
+
+    db = pushrodr.db
+    with app.test_request_context():
+        db.create_all()
+
+        authors = []
+        for i in xrange(10):
+            author = pushrodr.Author()
+            author.name = "Author %i" % i
+            author.description = "Writes things" * 10
+            db.session.add(author)
+            authors.append(author)
+
+        for i in xrange(posts):
+            post = pushrodr.Post()
+            post.title = "Post %i" % i
+            post.content = "Lorem ipsum dolor sit amet. " * 40
+            post.author = random.choice(authors)
+            db.session.add(post)
+
+            for j in xrange(comments):
+                comment = pushrodr.Comment()
+                comment.post = post
+                comment.author = "Commenter %i" % j
+                comment.content = "Spam, spam, spam, eggs and spam. " * 5
+                db.session.add(comment)
+
+        db.session.commit()
+
+    return app, path
+
+
+def _template_loader():
+    from jinja2 import DictLoader
+
+    return DictLoader({
+        'load.html': "<html><body><ul>{% for item in data %}<li>{{ item }}</li>{% endfor %}</ul></body></html>",
+    })
+
+
+def synthetic_app(payload):
+    """
+    Creates an app with a single view at ``/`` returning ``payload()``.
+    """
+
+    from flask import Flask
+    from flask_pushrod import Pushrod, pushrod_view
+
+    app = Flask(__name__)
+    app.jinja_loader = _template_loader()
+    Pushrod(app)
+
+    @app.route("/")
+    @pushrod_view(jinja_template='load.html')
+    def synthetic():
+        return {'data': payload()}
+
+    return app
+
+
+def flat_payload():
+    return dict(('field_%i' % i, i * 1.5 if i % 2 else "value %i" % i) for i in xrange(50))
+
+
+def records_payload():
+    return [{'id': i, 'name': "Record %i" % i, 'score': i / 7.0, 'tags': ['a', 'b', 'c'], 'active': bool(i % 2)}
+            for i in xrange(1000)]
+
+
+def nested_payload(depth=50):
+    node = {'leaf': True}
+    for i in xrange(depth):
+        node = {'level': i, 'name': "Node %i" % i, 'children': [node, {'leaf': True}]}
+    return node
+
+
+#: The payload shapes, as (app factory, path, supported renderers) tuples.
+#: The factory returns the app, and a file to remove afterwards (or :obj:`None`).
+shapes = {
+    'pushrodr-list': (lambda options: pushrodr_app(options.posts), '/', ('json',)),
+    'pushrodr-post': (lambda options: pushrodr_app(options.posts), '/posts/1', ('json',)),
+    'flat': (lambda options: (synthetic_app(flat_payload), None), '/', ('json', 'html')),
+    'records': (lambda options: (synthetic_app(records_payload), None), '/', ('json', 'html')),
+    'nested': (lambda options: (synthetic_app(nested_payload), None), '/', ('json', 'html')),
+}
+
+
+def run_scenario(app, path, mime_type, duration, concurrency):
+    """
+    Sends requests to ``app`` from ``concurrency`` threads for ``duration`` seconds.
+
+    :returns: A :obj:`dict` with the results
+    """
+
+    environ = EnvironBuilder(path, headers=[('Accept', mime_type)]).get_environ()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker():
+        local_latencies = []
+        local_statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            local_statuses.append(status)
+
+        while time.time() < deadline:
+            request_environ = dict(environ, **{'wsgi.input': StringIO('')})
+
+            start = time.time()
+            app_iter = app(request_environ, start_response)
+            try:
+                for chunk in app_iter:
+                    pass
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            local_latencies.append(time.time() - start)
+
+        with lock:
+            latencies.extend(local_latencies)
+            for status in local_statuses:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    # Warm up, so that one-time costs (imports, template compilation, schema compilation) aren't measured
+    worker_deadline, deadline = deadline, time.time() + 0.2
+    worker()
+    del latencies[:]
+    statuses.clear()
+    deadline = worker_deadline + 0.2
+
+    started = time.time()
+    threads = [threading.Thread(target=worker) for i in xrange(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100.0))]
+
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'statuses': statuses,
+        # ru_maxrss is in kilobytes on Linux (but bytes on OS X)
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_one(options):
+    factory, path, supported = shapes[options.shape]
+    app, cleanup = factory(options)
+
+    try:
+        result = run_scenario(app, path, renderer_mime_types[options.renderer], options.duration, options.concurrency)
+    finally:
+        if cleanup:
+            os.remove(cleanup)
+
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=5, help="seconds to run each scenario for")
+    parser.add_argument('--concurrency', type=int, default=4, help="number of threads sending requests")
+    parser.add_argument('--renderers', default='json,html', help="comma-separated renderers to test (%s)" % ', '.join(sorted(renderer_mime_types)))
+    parser.add_argument('--shapes', default=','.join(sorted(shapes)), help="comma-separated payload shapes to test (%s)" % ', '.join(sorted(shapes)))
+    parser.add_argument('--posts', type=int, default=200, help="posts to create in the pushrodr database")
+    parser.add_argument('--run-one', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--shape', help=argparse.SUPPRESS)
+    parser.add_argument('--renderer', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.run_one:
+        return run_one(options)
+
+    print("%-16s %-6s %9s %9s %9s %9s %10s  %s" % ("shape", "format", "req/s", "p50 ms", "p95 ms", "p99 ms", "peak RSS", "statuses"))
+
+    for shape in options.shapes.split(','):
+        for renderer in options.renderers.split(','):
+            if renderer not in shapes[shape][2]:
+                continue
+
+            output = subprocess.check_output([
+                sys.executable, os.path.abspath(__file__), '--run-one',
+                '--shape', shape,
+                '--renderer', renderer,
+                '--duration', str(options.duration),
+                '--concurrency', str(options.concurrency),
+                '--posts', str(options.posts),
+            ])
+            result = json.loads(output.splitlines()[-1])
+
+            print("%-16s %-6s %9.1f %9.2f %9.2f %9.2f %7.1f MB  %s" % (
+                shape, renderer, result['throughput'],
+                result['p50'] * 1000, result['p95'] * 1000, result['p99'] * 1000,
+                result['peak_rss'] / 1024.0,
+                ', '.join('%s: %i' % item for item in sorted(result['statuses'].items()))))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 from .resolver import Pushrod, pushrod_view
 from .renderers import UnrenderedResponse
+from .raw import RawJSON
+from .batch import batch_view
 
-from . import renderers, resolver
+from . import parsers, renderers, resolver
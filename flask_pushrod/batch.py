@@ -0,0 +1,173 @@
+"""
+A batch endpoint, which lets clients make several API calls in a single request (see :func:`batch_view`).
+
+The request body is a list of sub-requests, each a :obj:`dict` with a ``path`` (which may include a query string) and optionally a ``method`` (``GET`` by default), ``headers`` and a ``body`` (which is sent to the view as JSON)::
+
+    [
+        {"path": "/posts?page=1"},
+        {"path": "/users/me"},
+        {"method": "POST", "path": "/posts/1/read", "body": {"read": true}}
+    ]
+
+The sub-requests are dispatched to their views internally, without another HTTP round trip. :func:`~flask.ext.pushrod.pushrod_view` views return their unrendered responses to the batch, which are normalized while the sub-request is still active (so normalizers can depend on its request state, such as :data:`flask.g`), and then rendered as a single response, with the renderer negotiated for the batch request itself::
+
+    {
+        "responses": [
+            {"status": 200, "headers": {}, "body": {"posts": [...]}},
+            {"status": 200, "headers": {}, "body": {"name": "Monty"}},
+            {"status": 404, "headers": {}, "body": {"error": "Not Found", "description": "..."}}
+        ]
+    }
+
+Other views are rendered as usual, and their body is included as a string.
+"""
+
+from flask import current_app, request as current_request
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import BadRequest, HTTPException
+from werkzeug.wrappers import BaseResponse
+
+from .renderers import UnrenderedResponse
+from .resolver import _is_binary
+
+from multiprocessing.pool import ThreadPool
+
+import json
+import threading
+
+
+#: Headers of the batch request that sub-requests don't inherit, since they describe the batch request's own body.
+uninherited_headers = frozenset(['Content-Type', 'Content-Length', 'Content-Encoding', 'Transfer-Encoding'])
+
+
+def batch_view(max_requests=20, threads=None):
+    """
+    Creates a batch view function, which can be mounted at any URL::
+
+        app.add_url_rule('/batch', 'batch', batch_view(), methods=['POST'])
+
+    Sub-requests inherit the batch request's headers (such as ``Cookie`` and ``Authorization``), which can be overridden by their own ``headers``. Each sub-request runs in its own request context, so ``before_request`` functions are run for it. Since pushrod views return their responses unrendered, ``after_request`` functions are not.
+
+    .. note::
+       The whole batch is rendered as one response, so the ``static``, ``cache_control``, ``layout``, ``references``, ``deltas`` and ``native`` options (and renderer arguments) of the sub-requests' :func:`~flask.ext.pushrod.pushrod_view` decorators are ignored.
+    .. note::
+       The budgets of :attr:`~flask.ext.pushrod.Pushrod.max_elements`, :attr:`~flask.ext.pushrod.Pushrod.max_depth` and :attr:`~flask.ext.pushrod.Pushrod.render_timeout` apply to each sub-request's response separately, while :attr:`~flask.ext.pushrod.Pushrod.max_output_bytes` applies to the whole batch.
+    .. note::
+       Batches can't be nested, a sub-request to a batch view fails with a 400 Bad Request error (otherwise every level of nesting would multiply the work by ``max_requests``).
+
+    :param max_requests: The maximum number of sub-requests in a single batch, larger batches are rejected with a 400 Bad Request error
+    :param threads: If set then the sub-requests are dispatched concurrently, by a pool of this many threads (which is shared by all requests to the view). Only use this if the sub-requests are independent of each other, and the views are thread-safe
+    """
+
+    pool = []
+    pool_lock = threading.Lock()
+
+    def get_pool():
+        with pool_lock:
+            if not pool:
+                pool.append(ThreadPool(threads))
+            return pool[0]
+
+    def view():
+        pushrod = current_app.extensions['pushrod']
+        if getattr(pushrod._local, 'unrendered', False):
+            # This is a sub-request of another batch
+            raise BadRequest(u"Batches can't be nested.")
+
+        subrequests = _validate(pushrod.parse_request(), max_requests)
+
+        app = current_app._get_current_object()
+        base_url = current_request.url_root
+        inherited = [(name, value) for name, value in current_request.headers if name not in uninherited_headers]
+
+        def dispatch(subrequest):
+            return _dispatch(app, pushrod, base_url, inherited, subrequest)
+
+        if threads and len(subrequests) > 1:
+            results = get_pool().map(dispatch, subrequests)
+        else:
+            results = map(dispatch, subrequests)
+
+        # The results are already normalized, so the batch is only encoded
+        return pushrod.render_response({u'responses': results}, native=True)
+
+    return view
+
+
+def _validate(subrequests, max_requests):
+    if not isinstance(subrequests, list):
+        raise BadRequest(u"The batch must be a list of requests.")
+
+    if max_requests is not None and len(subrequests) > max_requests:
+        raise BadRequest(u"The batch may contain at most %i requests." % max_requests)
+
+    for subrequest in subrequests:
+        if not isinstance(subrequest, dict) or not isinstance(subrequest.get('path'), basestring):
+            raise BadRequest(u"Every request in the batch must be an object with a path.")
+        if not isinstance(subrequest.get('headers', {}), dict):
+            raise BadRequest(u"The headers of a request in the batch must be an object.")
+
+    return subrequests
+
+
+def _dispatch(app, pushrod, base_url, inherited, subrequest):
+    headers = Headers(inherited)
+    for name, value in subrequest.get('headers', {}).iteritems():
+        headers[name] = value
+
+    kwargs = {}
+    if 'body' in subrequest:
+        kwargs['data'] = json.dumps(subrequest['body'])
+        kwargs['content_type'] = 'application/json'
+
+    with app.test_request_context(subrequest['path'], base_url=base_url,
+                                  method=subrequest.get('method', 'GET').upper(),
+                                  headers=headers, **kwargs):
+        with pushrod._unrendered():
+            try:
+                response = app.preprocess_request()
+                if response is None:
+                    response = app.dispatch_request()
+            except HTTPException as e:
+                response = app.handle_http_exception(e)
+
+        # Still inside the sub-request's context, since normalizing may depend on it
+        return _result(app, pushrod, response)
+
+
+def _result(app, pushrod, response):
+    if isinstance(response, tuple):
+        response = UnrenderedResponse(*response)
+    elif not isinstance(response, (UnrenderedResponse, BaseResponse, HTTPException)):
+        response = UnrenderedResponse(response)
+
+    if isinstance(response, HTTPException):
+        return {
+            u'status': response.code,
+            u'headers': {},
+            u'body': {u'error': response.name, u'description': response.description},
+        }
+
+    if isinstance(response, UnrenderedResponse):
+        body = response.response
+        if isinstance(body, basestring):
+            response = app.make_response((body, response.status, response.headers))
+        elif _is_binary(body):
+            response = pushrod.render_response(response)
+        else:
+            result = {
+                u'status': response.status or 200,
+                u'headers': pushrod.normalize(dict(Headers(response.headers or ()))),
+            }
+            if not response.native:
+                body = pushrod.normalize(body)
+            if body is not NotImplemented:
+                result[u'body'] = body
+            return result
+
+    headers = dict((name, value) for name, value in response.headers if name not in ('Content-Length', 'Content-Type'))
+    return {
+        u'status': response.status_code,
+        u'headers': headers,
+        u'body': response.data.decode(response.charset, 'replace'),
+    }
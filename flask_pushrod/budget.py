@@ -0,0 +1,126 @@
+"""
+Budgets that limit how much work normalizing and rendering a single response may do (see :attr:`Pushrod.max_elements <flask.ext.pushrod.Pushrod.max_elements>` and friends).
+
+A budget is started by :meth:`~flask.ext.pushrod.Pushrod.render_response` (or by :meth:`~flask.ext.pushrod.Pushrod.normalize`, when called on its own), and is shared by all nested normalizer calls in the same thread, so that a view returning a runaway generator is aborted as soon as the limit is reached, rather than after it has been consumed.
+"""
+
+from werkzeug.exceptions import InternalServerError, ServiceUnavailable
+
+import time
+
+
+class BudgetExceeded(InternalServerError):
+    """
+    Raised when normalizing or rendering a response exceeds one of its budgets.
+
+    .. note::
+       This class inherits from :exc:`werkzeug.exceptions.InternalServerError`, so it's converted to ``500 Internal Server Error`` if not explicitly handled. Exceeding the element, depth or output limits is deterministic, so retrying the request wouldn't help.
+    """
+
+    description = u"The response was too large, or took too long to produce."
+
+
+class DeadlineExceeded(BudgetExceeded):
+    """
+    Raised when normalizing or rendering a response takes longer than its deadline.
+
+    .. note::
+       Unlike other :class:`BudgetExceeded` errors it's converted to ``503 Service Unavailable``, since the deadline may only have been missed because the server was busy.
+    """
+
+    code = ServiceUnavailable.code
+    description = u"The response took too long to produce."
+
+
+class Budget(object):
+    """
+    Tracks the work done for a single response, any limit may be :obj:`None` to disable it.
+
+    :param max_elements: The maximum number of values to normalize (every container, dict value and list item counts)
+    :param max_depth: The maximum container nesting depth
+    :param max_output_bytes: The maximum size of the rendered body
+    :param timeout: The maximum number of seconds that normalizing and rendering may take
+    """
+
+    #: How many elements to normalize between each check of the clock.
+    deadline_interval = 256
+
+    def __init__(self, max_elements=None, max_depth=None, max_output_bytes=None, timeout=None):
+        self.max_elements = max_elements
+        self.max_depth = max_depth
+        self.max_output_bytes = max_output_bytes
+        self.deadline = None if timeout is None else time.time() + timeout
+
+        #: The number of values normalized so far.
+        self.elements = 0
+        #: The depth of the value currently being normalized.
+        self.depth = 0
+        #: The number of bytes rendered so far.
+        self.output_bytes = 0
+
+    def step(self, depth):
+        """
+        Accounts for normalizing a single value at the given depth.
+
+        :throws BudgetExceeded: If the value is beyond the limits
+        """
+
+        self.elements += 1
+        self.depth = depth
+
+        if self.max_elements is not None and self.elements > self.max_elements:
+            raise BudgetExceeded(u"The response has more than %i elements." % self.max_elements)
+
+        if self.max_depth is not None and depth > self.max_depth:
+            raise BudgetExceeded(u"The response is nested more than %i levels deep." % self.max_depth)
+
+        if self.deadline is not None and not self.elements % self.deadline_interval:
+            self.check_deadline()
+
+    def check_deadline(self):
+        """
+        :throws DeadlineExceeded: If the deadline has passed
+        """
+
+        if self.deadline is not None and time.time() > self.deadline:
+            raise DeadlineExceeded(u"The response took too long to produce.")
+
+    def output(self, chunk):
+        """
+        Accounts for a rendered chunk of the body.
+
+        :throws BudgetExceeded: If the body has grown too large
+        """
+
+        self.output_bytes += len(chunk)
+
+        if self.max_output_bytes is not None and self.output_bytes > self.max_output_bytes:
+            raise BudgetExceeded(u"The response is larger than %i bytes." % self.max_output_bytes)
+
+    def limit_response(self, response):
+        """
+        Applies the output limit and deadline to a rendered :class:`~werkzeug.wrappers.BaseResponse`.
+
+        Buffered bodies are checked immediately, while streamed bodies are wrapped so that they are checked as they are sent.
+
+        .. note::
+           Since the status and headers have already been sent once a stream has started, exceeding the budget in the middle of one can only abort the connection.
+        """
+
+        self.check_deadline()
+
+        if response.is_sequence:
+            for chunk in response.response:
+                self.output(chunk)
+        elif self.max_output_bytes is not None or self.deadline is not None:
+            response.response = self._iter_limited(response.response)
+
+    def _iter_limited(self, chunks):
+        try:
+            for chunk in chunks:
+                self.output(chunk)
+                self.check_deadline()
+                yield chunk
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
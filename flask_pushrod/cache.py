@@ -0,0 +1,102 @@
+"""
+Caches used internally by Pushrod.
+
+All caches follow the ``get``/``set``/``add``/``delete``/``clear`` API of Werkzeug's cache backends, so any of them (such as ``werkzeug.contrib.cache.MemcachedCache`` or ``werkzeug.contrib.cache.RedisCache``) can be plugged in instead of the default :class:`LRUCache`. Pushrod doesn't depend on ``werkzeug.contrib`` itself, since it was removed in Werkzeug 1.0.
+"""
+
+from threading import Lock
+from time import time
+
+try:
+    from collections import OrderedDict
+except ImportError:  # pragma: no cover
+    # Python 2.6
+    from ordereddict import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A bounded in-memory cache that evicts the least recently used key once it grows past ``threshold`` items.
+
+    .. note::
+       Unlike Werkzeug's ``SimpleCache``, values are stored by reference rather than pickled, so they should be treated as immutable.
+
+    :param threshold: The maximum number of items to keep
+    :param default_timeout: The timeout (in seconds) to use if none is passed to :meth:`set`, 0 means that keys never expire
+    """
+
+    def __init__(self, threshold=500, default_timeout=300):
+        self.default_timeout = default_timeout
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self.threshold = threshold
+
+    def _expiry(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return time() + timeout if timeout else None
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._cache.pop(key)
+            except KeyError:
+                return None
+
+            if expires is not None and expires <= time():
+                return None
+
+            self._cache[key] = (expires, value)
+            return value
+
+    def _set(self, key, value, timeout):
+        # Must be called while holding the lock
+        self._cache.pop(key, None)
+        self._cache[key] = (self._expiry(timeout), value)
+
+        while len(self._cache) > self.threshold:
+            self._cache.popitem(last=False)
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        """
+        Sets the key only if it doesn't already exist (or has expired), atomically.
+
+        :returns: True if the key was set
+        """
+
+        with self._lock:
+            existing = self._cache.get(key)
+            if existing is not None and (existing[0] is None or existing[0] > time()):
+                return False
+
+            self._set(key, value, timeout)
+            return True
+
+    def delete(self, key):
+        """
+        :returns: True if the key existed
+        """
+
+        with self._lock:
+            return self._cache.pop(key, None) is not None
+
+    def has(self, key):
+        """
+        :returns: True if the key exists (and hasn't expired), without counting as a use
+        """
+
+        with self._lock:
+            existing = self._cache.get(key)
+            return existing is not None and (existing[0] is None or existing[0] > time())
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+        return True
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,128 @@
+"""
+Lazy normalization, for renderers that only look at a part of the response (see :meth:`flask.ext.pushrod.Pushrod.normalize`).
+
+Instead of normalizing the whole response up front, containers are wrapped in proxies that normalize each value the first time it is accessed, and then remember the result.
+"""
+
+from . import normalizers
+
+from collections import Mapping, Sequence
+
+
+class LazyNormalizer(object):
+    """
+    Stands in for the :class:`~flask.ext.pushrod.Pushrod` instance while normalizing lazily, so that normalizers which recurse through ``pushrod.normalize`` produce proxies rather than normalizing eagerly.
+
+    All other attributes are forwarded to the wrapped :class:`~flask.ext.pushrod.Pushrod` instance.
+    """
+
+    def __init__(self, pushrod):
+        self.pushrod = pushrod
+
+    def __getattr__(self, name):
+        return getattr(self.pushrod, name)
+
+    def normalize(self, obj, lazy=True):
+        if not lazy:
+            return self.pushrod.normalize(obj)
+
+        if isinstance(obj, (LazyDict, LazyList)):
+            return obj
+
+        normalizer = self.pushrod._container_normalizer(obj)
+        if normalizer is normalizers.normalize_dict:
+            return LazyDict(obj, self)
+        elif normalizer is normalizers.normalize_iterable:
+            return LazyList(obj, self)
+        else:
+            return self.pushrod._resolve(obj, self)
+
+
+class LazyDict(Mapping):
+    """
+    A read-only mapping that normalizes its values on first access, mirroring :func:`~flask.ext.pushrod.normalizers.normalize_dict`.
+
+    .. note::
+       Values that normalize to :obj:`NotImplemented` are dropped, so iterating over (or taking the length of) the mapping normalizes all values.
+    """
+
+    def __init__(self, source, pushrod):
+        self._pushrod = pushrod
+        self._source = dict((pushrod.normalize(unicode(k)), v) for k, v in source.items())
+        self._normalized = {}
+        self._complete = False
+
+    def __getitem__(self, key):
+        try:
+            value = self._normalized[key]
+        except KeyError:
+            value = self._normalized[key] = self._pushrod.normalize(self._source[key])
+
+        if value is NotImplemented:
+            raise KeyError(key)
+        return value
+
+    def _normalize_all(self):
+        if not self._complete:
+            for key in self._source:
+                if key not in self._normalized:
+                    self._normalized[key] = self._pushrod.normalize(self._source[key])
+            self._complete = True
+
+    def __iter__(self):
+        self._normalize_all()
+        return (k for k, v in self._normalized.iteritems() if v is not NotImplemented)
+
+    def __len__(self):
+        self._normalize_all()
+        return sum(1 for v in self._normalized.itervalues() if v is not NotImplemented)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __repr__(self):
+        return '<LazyDict %r>' % self._source.keys()
+
+
+class LazyList(Sequence):
+    """
+    A read-only sequence that normalizes its items on first access, mirroring :func:`~flask.ext.pushrod.normalizers.normalize_iterable`.
+
+    .. note::
+       Generators are consumed when the proxy is created, but their items aren't normalized until they're accessed.
+    """
+
+    _missing = object()
+
+    def __init__(self, source, pushrod):
+        self._pushrod = pushrod
+        self._source = source if isinstance(source, (list, tuple)) else list(source)
+        self._normalized = [self._missing] * len(self._source)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self)))]
+
+        value = self._normalized[index]
+        if value is self._missing:
+            value = self._normalized[index] = self._pushrod.normalize(self._source[index])
+        return value
+
+    def __len__(self):
+        return len(self._source)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return '<LazyList of %i items>' % len(self)
@@ -0,0 +1,163 @@
+"""
+Memory accounting for rendered responses (see :attr:`Pushrod.memory_accounting <flask.ext.pushrod.Pushrod.memory_accounting>`).
+
+If :mod:`tracemalloc` is available and tracing then it is used, otherwise the process' resident set size is sampled (from ``/proc/self/statm`` where available). Sampling is much cheaper, but also coarser, since it only sees memory that the allocator requests from the OS (and memory used by other threads at the same time).
+
+Each response is measured by a :class:`Measurement`, whose peak is relative to the memory usage when it started, rather than to the process' all-time high-water mark (which a response only raises if it uses more memory than any response before it).
+"""
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+_statm = '/proc/self/statm'
+
+
+def _tracing():
+    return tracemalloc is not None and tracemalloc.is_tracing()
+
+
+def _current_usage():
+    # Returns the current memory usage in bytes, or None if it can't be measured on this platform
+    if _tracing():
+        return tracemalloc.get_traced_memory()[0]
+
+    if resource is not None and os.path.exists(_statm):
+        with open(_statm) as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+
+    return None
+
+
+def memory_usage():
+    """
+    Samples the current memory usage of the process.
+
+    :returns: A (current, peak) :obj:`tuple` of byte counts, where peak is the process' all-time high-water mark, either may be :obj:`None` if it can't be measured on this platform
+    """
+
+    if _tracing():
+        return tracemalloc.get_traced_memory()
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            # Linux (and most other platforms) report kilobytes, OS X reports bytes
+            peak *= 1024
+
+    return _current_usage(), peak
+
+
+class Measurement(object):
+    """
+    Measures the memory used from when it is created until :meth:`finish` is called.
+
+    While tracing with a :mod:`tracemalloc` that can reset its peak (Python 3.9 and later), the peak is reset when the measurement starts. Otherwise the current memory usage is sampled by a background thread every :attr:`sample_interval` seconds for as long as any measurement is running, so allocations that are freed again between two samples are missed.
+    """
+
+    #: How often (in seconds) the memory usage is sampled while measurements are running, if it is sampled.
+    sample_interval = 0.005
+
+    def __init__(self):
+        self.before = _current_usage()
+        self.peak_usage = self.before
+        self._result = None
+        _sampler.add(self)
+
+    def sample(self, usage):
+        """
+        Raises the measured peak to usage, if it is higher.
+        """
+
+        if self.peak_usage is not None and usage is not None and usage > self.peak_usage:
+            self.peak_usage = usage
+
+    def finish(self):
+        """
+        Ends the measurement, later calls return the same result.
+
+        :returns: A (peak, allocated) :obj:`tuple`, where peak is how far the memory usage rose above where it was when the measurement started (how close it brought the process to being killed), and allocated is the net amount of memory that was allocated (and not freed again), either may be :obj:`None` if it couldn't be measured
+        """
+
+        if self._result is None:
+            _sampler.remove(self)
+            after = _current_usage()
+            self.sample(after)
+
+            if self.before is None or after is None:
+                self._result = (None, None)
+            else:
+                self._result = (self.peak_usage - self.before, after - self.before)
+
+        return self._result
+
+
+class _Sampler(object):
+    # Feeds the memory usage to the running measurements, by resetting tracemalloc's peak whenever a measurement starts
+    # (after handing the peak so far to the others), or by sampling from a background thread
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._measurements = set()
+        self._running = threading.Event()
+        self._thread = None
+
+    def add(self, measurement):
+        with self._lock:
+            if _tracing() and hasattr(tracemalloc, 'reset_peak'):
+                self._collect_peak()
+                tracemalloc.reset_peak()
+            elif measurement.before is not None:
+                if self._thread is None or not self._thread.is_alive():
+                    # Also after a fork, which only keeps the forking thread
+                    self._thread = threading.Thread(target=self._run, name='pushrod-memory-sampler')
+                    self._thread.daemon = True
+                    self._thread.start()
+                self._running.set()
+
+            self._measurements.add(measurement)
+
+    def remove(self, measurement):
+        with self._lock:
+            if _tracing() and hasattr(tracemalloc, 'reset_peak'):
+                self._collect_peak()
+            self._measurements.discard(measurement)
+
+    def _collect_peak(self):
+        # Must be called while holding the lock. The peak was last reset when the newest running measurement started,
+        # so it was reached while every running measurement was running.
+        peak = tracemalloc.get_traced_memory()[1]
+        for measurement in self._measurements:
+            measurement.sample(peak)
+
+    def _run(self):
+        while True:
+            self._running.wait()
+
+            with self._lock:
+                measurements = list(self._measurements)
+                if not measurements:
+                    self._running.clear()
+                    continue
+
+            usage = _current_usage()
+            for measurement in measurements:
+                measurement.sample(usage)
+
+            time.sleep(Measurement.sample_interval)
+
+
+_sampler = _Sampler()
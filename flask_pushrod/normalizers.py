@@ -8,6 +8,9 @@ Flask-Pushrod's built-in normalizers are generally named with the scheme :samp:`
 """
 
 
+from .raw import RawJSON
+
+
 def _call_if_callable(x, *args, **kwargs):
     return x(*args, **kwargs) if callable(x) else x
 
@@ -78,6 +81,14 @@ def normalize_none(x, pushrod):
     return None
 
 
+def normalize_raw_json(x, pushrod):
+    """
+    :takes: :class:`~flask.ext.pushrod.raw.RawJSON`
+    :returns: :class:`~flask.ext.pushrod.raw.RawJSON` (unchanged)
+    """
+    return x
+
+
 def normalize_object(x, pushrod):
     """
     Delegates normalization to the object itself, looking for the following attributes/methods (in this order):
@@ -85,9 +96,10 @@ def normalize_object(x, pushrod):
     - __pushrod_normalize__ - Essentially treated as if a normalizer was explicitly registered
     - __pushrod_fields__ - A list of names fields, which is essentially treated like ``{k: getattr(x, k) for k in x.__pushrod_fields__}``
     - __pushrod_field__ - A name of a single field, x is then substituted for what is (simplified) ``getattr(x, x.__pushrod_field)``
+    - __pushrod_raw_json__ - The object's serialized JSON, which is wrapped in a :class:`~flask.ext.pushrod.raw.RawJSON`
 
     .. note::
-       __pushrod_fields__ and __pushrod_field__ can be either a callable or an attribute, while __pushrod_normalize__ must be a callable.
+       __pushrod_fields__, __pushrod_field__ and __pushrod_raw_json__ can be either a callable or an attribute, while __pushrod_normalize__ must be a callable.
 
     :takes: :obj:`object`
     """
@@ -96,10 +108,143 @@ def normalize_object(x, pushrod):
 
     if hasattr(x, '__pushrod_fields__'):
         fields = _call_if_callable(x.__pushrod_fields__)
-        return pushrod.normalize(dict((name, pushrod.normalize(getattr(x, name))) for name in fields))
+        return pushrod.normalize(dict((name, getattr(x, name)) for name in fields))
 
     if hasattr(x, '__pushrod_field__'):
         field = _call_if_callable(x.__pushrod_field__)
         return pushrod.normalize(getattr(x, field))
 
+    if hasattr(x, '__pushrod_raw_json__'):
+        return RawJSON(_call_if_callable(x.__pushrod_raw_json__))
+
     return NotImplemented
+
+
+#: The types that a native value (see :func:`check_native`) may consist of.
+native_types = (unicode, str, int, long, float, bool, type(None), RawJSON)
+
+
+def check_native(x):
+    """
+    Checks that a value is already normalized, consisting only of :obj:`dicts <dict>` with string keys, :obj:`lists <list>` and :data:`native_types`.
+
+    Used to verify native responses (see :attr:`UnrenderedResponse.native <flask.ext.pushrod.renderers.UnrenderedResponse.native>`) while the app is in debug mode.
+
+    :throws TypeError: If a value isn't native, naming the path to it
+    """
+
+    stack = [(u'', x)]
+    while stack:
+        path, value = stack.pop()
+        value_type = type(value)
+
+        if value_type is dict:
+            for key, child in value.iteritems():
+                if not isinstance(key, basestring):
+                    raise TypeError(u"The key %r at '%s' of a native response is not a string" % (key, path or u'/'))
+                stack.append((u'%s/%s' % (path, key), child))
+        elif value_type is list:
+            stack.extend((u'%s/%i' % (path, i), child) for i, child in enumerate(value))
+        elif not isinstance(value, native_types):
+            raise TypeError(u"The value %r at '%s' of a native response is not native (%s)" % (value, path or u'/', value_type.__name__))
+
+
+def _normalize_array(x, pushrod):
+    if x.dtype.kind in 'biuf':
+        # tolist() converts numeric arrays to native types in C, so there is nothing left to normalize
+        return x.tolist()
+    elif x.dtype.kind == 'M':
+        # datetime64 values would otherwise come out as raw integers
+        return pushrod.normalize(x.astype('datetime64[us]').tolist())
+    else:
+        return pushrod.normalize(x.tolist())
+
+
+def normalize_numpy_array(x, pushrod):
+    """
+    Only registered once a NumPy value is normalized.
+
+    Numeric (boolean, integer, and floating point) arrays are converted in bulk, without normalizing each element separately.
+
+    :takes: :class:`numpy.ndarray`
+    :returns: :obj:`list` (nested for multidimensional arrays)
+    """
+    return _normalize_array(x, pushrod)
+
+
+def normalize_numpy_scalar(x, pushrod):
+    """
+    Only registered once a NumPy value is normalized.
+
+    :takes: :class:`numpy.generic` (such as :class:`numpy.int64` or :class:`numpy.float32`)
+    :returns: The equivalent native value, :meth:`normalized <flask.ext.pushrod.Pushrod.normalize>`
+    """
+    return pushrod.normalize(x.item())
+
+
+def normalize_pandas_series(x, pushrod):
+    """
+    Only registered once a pandas value is normalized.
+
+    The index is discarded.
+
+    :takes: :class:`pandas.Series`
+    :returns: :obj:`list`
+    """
+    return _normalize_array(x.values, pushrod)
+
+
+def normalize_pandas_dataframe(x, pushrod):
+    """
+    Only registered once a pandas value is normalized.
+
+    The layout depends on :attr:`Pushrod.dataframe_layout <flask.ext.pushrod.Pushrod.dataframe_layout>`:
+
+    - ``records`` - A list of rows, where each row is a :obj:`dict` of column names to values
+    - ``columns`` - A :obj:`dict` of column names to lists of values
+
+    Either way each column is converted in bulk, and the index is discarded.
+
+    :takes: :class:`pandas.DataFrame`
+    :returns: :obj:`list` or :obj:`dict` (see above)
+    """
+    names = [pushrod.normalize(unicode(name)) for name in x.columns]
+    columns = [_normalize_array(x[name].values, pushrod) for name in x.columns]
+
+    if pushrod.dataframe_layout == 'columns':
+        return dict(zip(names, columns))
+    else:
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def numpy_normalizers():
+    """
+    :returns: The normalizers for NumPy types, keyed by type
+    """
+    import numpy
+
+    return {
+        numpy.ndarray: normalize_numpy_array,
+        numpy.generic: normalize_numpy_scalar,
+    }
+
+
+def pandas_normalizers():
+    """
+    :returns: The normalizers for pandas types, keyed by type
+    """
+    import pandas
+
+    return {
+        pandas.Series: normalize_pandas_series,
+        pandas.DataFrame: normalize_pandas_dataframe,
+    }
+
+
+#: Loaders for the normalizers of optional libraries, keyed by the library's top-level module name.
+#:
+#: They are only called once a value from that library is normalized (see :attr:`Pushrod.optional_normalizers <flask.ext.pushrod.Pushrod.optional_normalizers>`), so that the libraries aren't imported by Pushrod itself.
+optional_normalizers = {
+    'numpy': numpy_normalizers,
+    'pandas': pandas_normalizers,
+}
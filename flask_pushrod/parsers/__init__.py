@@ -0,0 +1,6 @@
+from . import base
+
+from .base import ParserNotFound, parser
+from .json import json_parser, ndjson_parser
+from .form import form_parser
+from .msgpack import msgpack_parser
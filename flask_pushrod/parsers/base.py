@@ -0,0 +1,63 @@
+from werkzeug.exceptions import UnsupportedMediaType
+
+import codecs
+
+
+def parser(name=None, mime_type=None):
+    """
+    Flags a function as a Pushrod parser, the request body counterpart of a :func:`renderer <flask.ext.pushrod.renderers.renderer>`.
+
+    Parsers are called with the :class:`~flask.Request` and a ``stream`` flag, and should return the decoded body. If ``stream`` is True then they should instead return an iterator over the records in the body, decoding them incrementally where the format allows it. A parser may decline by returning :obj:`NotImplemented`.
+
+    .. note::
+       Before it is recognized by :meth:`flask.ext.pushrod.Pushrod.parse_request` it must be registered to the app's :class:`~flask.ext.pushrod.Pushrod` instance (using :meth:`~flask.ext.pushrod.Pushrod.register_parser`, or passed as part of the ``parsers`` argument to the :class:`~flask.ext.pushrod.Pushrod` constructor).
+
+    :param name: A :obj:`basestring` or a tuple of basestrings to refer to the parser by
+    :param mime_type: A :obj:`basestring` or a tuple of basestrings to match against the request's Content-Type
+    """
+
+    if not name:  # pragma: no cover
+        name = ()
+    if isinstance(name, basestring):
+        name = (name,)
+
+    if not mime_type:  # pragma: no cover
+        mime_type = ()
+    if isinstance(mime_type, basestring):
+        mime_type = (mime_type,)
+
+    def decorator(f):
+        f._is_pushrod_parser = True
+        f.parser_names = name
+        f.parser_mime_types = mime_type
+        return f
+
+    return decorator
+
+
+def request_charset(request):
+    """
+    Gets the charset of the request body, from the Content-Type's ``charset`` parameter (defaults to UTF-8).
+
+    :throws ValueError: If the charset is unknown
+    """
+
+    charset = request.mimetype_params.get('charset', 'utf-8')
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        raise ValueError(u"Unknown charset '%s'" % charset)
+    return charset
+
+
+class ParserNotFound(UnsupportedMediaType):
+    """
+    Thrown when no parser can handle the request's Content-Type, see :meth:`flask.ext.pushrod.Pushrod.parse_request`.
+
+    .. note::
+       This class inherits from :exc:`werkzeug.exceptions.UnsupportedMediaType`, so it's automatically converted to ``415 Unsupported Media Type`` by Werkzeug if not explicitly handled.
+    """
+
+    def __init__(self):
+        super(ParserNotFound, self).__init__(
+            u"The request body's content type is not supported")
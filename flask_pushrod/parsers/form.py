@@ -0,0 +1,19 @@
+from .base import parser
+
+
+@parser('form', ('application/x-www-form-urlencoded', 'multipart/form-data'))
+def form_parser(request, stream=False, **kwargs):
+    """
+    Parses a form request body using Werkzeug's form parser (:attr:`flask.Request.form`).
+
+    When streaming, the ``(key, value)`` pairs are returned one by one (files are left in :attr:`flask.Request.files`).
+
+    :Parser MIME type triggers: - application/x-www-form-urlencoded
+                                - multipart/form-data
+    :Parser name triggers: - form
+    """
+
+    if stream:
+        return request.form.iteritems(multi=True)
+    else:
+        return request.form
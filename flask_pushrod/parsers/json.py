@@ -0,0 +1,178 @@
+from __future__ import absolute_import
+
+
+from .base import parser, request_charset
+
+import codecs
+import json
+import re
+
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+# The rest of a string (after its opening quote), the text up to the next structural character, and the rest of a scalar
+_string_rest = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_unstructured = re.compile(r'[^"\[\]{}]*')
+_scalar_rest = re.compile(r'[^,\]}\s]*')
+
+
+def _scan_item(buf, i, depth):
+    # Finds the end of the JSON value that starts at i (or continues scanning a container from i, at the given depth),
+    # without decoding it. Returns (i, depth, complete), where i is the end of the value if it is complete, and
+    # otherwise the position to continue scanning from once more has been read.
+    end = len(buf)
+
+    if not depth:
+        char = buf[i]
+        if char == u'"':
+            match = _string_rest.match(buf, i + 1)
+            return (match.end(), 0, True) if match else (i, 0, False)
+        elif char not in u'[{':
+            scalar_end = _scalar_rest.match(buf, i).end()
+            return (scalar_end, 0, True) if scalar_end < end else (i, 0, False)
+
+    while True:
+        i = _unstructured.match(buf, i).end()
+        if i == end:
+            return i, depth, False
+
+        if buf[i] == u'"':
+            match = _string_rest.match(buf, i + 1)
+            if match is None:
+                return i, depth, False
+            i = match.end()
+        else:
+            depth += 1 if buf[i] in u'[{' else -1
+            i += 1
+            if not depth:
+                return i, 0, True
+
+
+def iter_json_array(stream, charset='utf-8', chunk_size=16384):
+    """
+    Incrementally decodes a JSON array from a file-like object, yielding each item as soon as it has been read.
+
+    If the document is not an array then it is decoded as a whole and yielded as a single item.
+
+    :param stream: The file-like object to read from
+    :param charset: The charset to decode the stream with
+    :param chunk_size: How many bytes to read at a time
+    :throws ValueError: If the document is not valid JSON (as soon as the invalid item has been read)
+    """
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(charset)()
+
+    buf = u''
+    eof = False
+
+    def read():
+        chunk = stream.read(chunk_size)
+        return text_decoder.decode(chunk, final=not chunk), not chunk
+
+    # Find the start of the document
+    while True:
+        buf = buf[_whitespace.match(buf).end():]
+        if buf or eof:
+            break
+        more, eof = read()
+        buf += more
+
+    if not buf.startswith(u'['):
+        while not eof:
+            more, eof = read()
+            buf += more
+        yield json.loads(buf)
+        return
+
+    pos = 1
+    expect_item = True
+    # How far the item at pos has been scanned, as (position, depth), if it continues past the end of buf
+    scanned = None
+    while True:
+        pos = _whitespace.match(buf, pos).end()
+
+        if pos < len(buf):
+            char = buf[pos]
+            if char == u']' and expect_item is not None:
+                return
+            elif char == u',' and expect_item is False:
+                pos += 1
+                expect_item = None
+                continue
+            elif expect_item is not False:
+                i, depth, complete = _scan_item(buf, *(scanned or (pos, 0)))
+                if complete:
+                    # The item is complete, so failing to decode it means that it is invalid
+                    item, pos = decoder.raw_decode(buf, pos)
+                    yield item
+                    scanned = None
+                    expect_item = False
+                    continue
+                scanned = (i, depth)
+            else:
+                raise ValueError(u"Expected ',' or ']' at position %i" % pos)
+
+        if eof:
+            raise ValueError(u"Unterminated JSON array")
+
+        more, eof = read()
+        # Drop everything before pos, once per chunk rather than once per item
+        if scanned:
+            scanned = (scanned[0] - pos, scanned[1])
+        buf = buf[pos:] + more
+        pos = 0
+
+
+def iter_ndjson(stream, charset='utf-8'):
+    """
+    Decodes newline-delimited JSON from a file-like object, one line at a time (blank lines are skipped).
+
+    :param stream: The file-like object to read from
+    :param charset: The charset to decode the stream with
+    :throws ValueError: If a line is not valid JSON
+    """
+
+    # Iterating over some streams (such as Werkzeug's LimitedStream) never stops, so go through readline
+    for line in iter(stream.readline, ''):
+        line = line.decode(charset).strip()
+        if line:
+            yield json.loads(line)
+
+
+@parser('json', 'application/json')
+def json_parser(request, stream=False, **kwargs):
+    """
+    Parses a request body using :func:`json.loads`.
+
+    When streaming, the items of a top-level array are decoded incrementally (see :func:`iter_json_array`).
+
+    :Parser MIME type triggers: - application/json
+    :Parser name triggers: - json
+    """
+
+    charset = request_charset(request)
+
+    if stream:
+        return iter_json_array(request.stream, charset)
+    else:
+        return json.loads(request.data.decode(charset))
+
+
+@parser('ndjson', ('application/x-ndjson', 'application/x-json-stream'))
+def ndjson_parser(request, stream=False, **kwargs):
+    """
+    Parses a newline-delimited JSON request body, where each line is a separate JSON document.
+
+    When streaming, the lines are decoded as they are read (see :func:`iter_ndjson`), otherwise a :obj:`list` of all documents is returned.
+
+    :Parser MIME type triggers: - application/x-ndjson
+                                - application/x-json-stream
+    :Parser name triggers: - ndjson
+    """
+
+    records = iter_ndjson(request.stream, request_charset(request))
+
+    if stream:
+        return records
+    else:
+        return list(records)
@@ -0,0 +1,27 @@
+from __future__ import absolute_import
+
+
+from .base import parser
+
+
+@parser('msgpack', ('application/msgpack', 'application/x-msgpack'))
+def msgpack_parser(request, stream=False, **kwargs):
+    """
+    Parses a MessagePack request body, declining if the ``msgpack`` package isn't installed.
+
+    When streaming, each top-level object is decoded as soon as it has been read, so a body consisting of concatenated objects is consumed incrementally.
+
+    :Parser MIME type triggers: - application/msgpack
+                                - application/x-msgpack
+    :Parser name triggers: - msgpack
+    """
+
+    try:
+        import msgpack
+    except ImportError:  # pragma: no cover
+        return NotImplemented
+
+    if stream:
+        return msgpack.Unpacker(request.stream)
+    else:
+        return msgpack.unpackb(request.data)
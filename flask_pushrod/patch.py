@@ -0,0 +1,149 @@
+"""
+Delta responses, where a client that already has an older version of a response only receives an :rfc:`6902` JSON Patch to the current version (see the ``deltas`` argument of :func:`~flask.ext.pushrod.pushrod_view`).
+
+Every version of a delta-enabled response is tagged with an ETag per renderer (see :func:`version_tag`), and a snapshot of its normalized form (see :func:`snapshot`) is kept in :attr:`Pushrod.delta_store <flask.ext.pushrod.Pushrod.delta_store>` for a while. When a client sends the ETag of a version that is still stored in the If-None-Match:-header and accepts ``application/json-patch+json``, the patch between that version and the current one is sent instead of the full response (patches apply to the JSON document, so only the ETags of JSON responses can be patched from)::
+
+    GET /posts/1 HTTP/1.1
+    Accept: application/json-patch+json, application/json
+    If-None-Match: "2b3f..."
+
+    HTTP/1.1 200 OK
+    Content-Type: application/json-patch+json
+    ETag: "9c1a..."
+
+    [{"op": "replace", "path": "/post/title", "value": "Spam and eggs"}]
+
+Otherwise the full response is sent as usual (or ``304 Not Modified``, if the client already has the current version).
+"""
+
+from .raw import RawJSON
+
+import hashlib
+import json
+
+
+#: The MIME type of JSON Patch documents.
+patch_mime_type = 'application/json-patch+json'
+
+
+def snapshot(normalized):
+    """
+    Serializes a normalized value as canonical JSON (with sorted keys, and :class:`~flask.ext.pushrod.raw.RawJSON` values decoded), which is what versions are stored as in :attr:`Pushrod.delta_store <flask.ext.pushrod.Pushrod.delta_store>`.
+
+    Unlike the value itself, the snapshot can't be changed afterwards (for example by a view that keeps modifying a native response).
+
+    :returns: :obj:`str`
+    """
+
+    def default(o):
+        if isinstance(o, RawJSON):
+            return o.decode()
+        raise TypeError(repr(o) + " is not JSON serializable")
+
+    return json.dumps(normalized, sort_keys=True, default=default)
+
+
+def version_tag(normalized, variant=None, serialized=None):
+    """
+    :param normalized: A normalized value
+    :param variant: The representation that the tag is for (such as the name of the renderer), since each representation of the same value needs its own ETag
+    :param serialized: The value's :func:`snapshot`, if it has already been taken
+    :returns: A tag that identifies the value's contents (suitable for use as an ETag)
+    """
+
+    if serialized is None:
+        serialized = snapshot(normalized)
+
+    tag = hashlib.sha1(serialized)
+    if variant is not None:
+        tag.update('\0' + variant.encode('utf-8'))
+    return tag.hexdigest()
+
+
+def escape_pointer(key):
+    """
+    Escapes a key for use in an :rfc:`6901` JSON Pointer.
+    """
+
+    return unicode(key).replace(u'~', u'~0').replace(u'/', u'~1')
+
+
+def _same(old, new):
+    # True and 1 are equal in Python, but not in JSON
+    return old == new and isinstance(old, bool) == isinstance(new, bool)
+
+
+def diff(old, new, path=u''):
+    """
+    Computes the operations that turn one normalized value into another.
+
+    Dicts are compared key by key, and lists are compared item by item (so appending to or removing from the end of a list is cheap, but inserting at the front replaces every following item).
+
+    :param old: The original normalized value
+    :param new: The new normalized value
+    :param path: The JSON Pointer of the values, if they are part of a larger document
+    :returns: A :obj:`list` of :rfc:`6902` operations
+    """
+
+    operations = []
+
+    if type(old) is dict and type(new) is dict:
+        for key in old:
+            if key not in new:
+                operations.append({u'op': u'remove', u'path': u'%s/%s' % (path, escape_pointer(key))})
+        for key, value in new.iteritems():
+            child = u'%s/%s' % (path, escape_pointer(key))
+            if key not in old:
+                operations.append({u'op': u'add', u'path': child, u'value': value})
+            else:
+                operations.extend(diff(old[key], value, child))
+
+    elif type(old) is list and type(new) is list:
+        for index in xrange(min(len(old), len(new))):
+            operations.extend(diff(old[index], new[index], u'%s/%i' % (path, index)))
+        for index in xrange(len(old) - 1, len(new) - 1, -1):
+            operations.append({u'op': u'remove', u'path': u'%s/%i' % (path, index)})
+        for value in new[len(old):]:
+            operations.append({u'op': u'add', u'path': u'%s/-' % path, u'value': value})
+
+    elif not _same(old, new):
+        operations.append({u'op': u'replace', u'path': path, u'value': new})
+
+    return operations
+
+
+def apply_patch(document, operations):
+    """
+    Applies the ``add``, ``remove`` and ``replace`` operations (as produced by :func:`diff`) to a normalized value, in place.
+
+    :returns: The patched value (which is a different object if the whole document was replaced)
+    """
+
+    for operation in operations:
+        tokens = [token.replace(u'~1', u'/').replace(u'~0', u'~') for token in operation[u'path'].split(u'/')[1:]]
+        if not tokens:
+            document = operation.get(u'value')
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token) if type(parent) is list else token]
+
+        key = tokens[-1]
+        if type(parent) is list and key != u'-':
+            key = int(key)
+
+        op = operation[u'op']
+        if op == u'remove':
+            del parent[key]
+        elif op == u'add' and type(parent) is list:
+            if key == u'-':
+                parent.append(operation[u'value'])
+            else:
+                parent.insert(key, operation[u'value'])
+        elif op in (u'add', u'replace'):
+            parent[key] = operation[u'value']
+        else:
+            raise ValueError(u"Unsupported JSON Patch operation '%s'" % op)
+
+    return document
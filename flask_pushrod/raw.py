@@ -0,0 +1,61 @@
+"""
+Pre-serialized JSON, which is passed through normalization untouched and spliced verbatim into the output of :func:`~flask.ext.pushrod.renderers.json.json_renderer`.
+"""
+
+from json import loads
+
+
+_missing = object()
+
+
+class RawJSON(object):
+    """
+    Wraps a value that has already been serialized to JSON (for example one that is stored in a database column or a cache), so that it doesn't have to be decoded only to be encoded again.
+
+    Objects can also provide their JSON themselves, using a ``__pushrod_raw_json__`` attribute or method (see :func:`~flask.ext.pushrod.normalizers.normalize_object`).
+
+    Renderers other than :func:`~flask.ext.pushrod.renderers.json.json_renderer` see the :class:`RawJSON` object itself, which decodes the JSON the first time it is indexed or iterated over (for example by a template), or when :meth:`decode` is called.
+
+    .. note::
+       The JSON is trusted, and isn't validated before it is spliced into the output.
+
+    :param json: The serialized JSON, as UTF-8 :obj:`str` or :obj:`unicode`
+    """
+
+    __slots__ = ('json', '_decoded')
+
+    def __init__(self, json):
+        self.json = json
+        self._decoded = _missing
+
+    def decode(self):
+        """
+        :returns: The decoded value (which is cached)
+        """
+
+        if self._decoded is _missing:
+            self._decoded = loads(self.json)
+        return self._decoded
+
+    def __getitem__(self, key):
+        return self.decode()[key]
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
+
+    def __contains__(self, item):
+        return item in self.decode()
+
+    def __eq__(self, other):
+        if isinstance(other, RawJSON):
+            other = other.decode()
+        return self.decode() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<RawJSON %r>' % self.json
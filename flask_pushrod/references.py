@@ -0,0 +1,130 @@
+"""
+Reference-deduplicated output, where objects that occur more than once in a response are only included once (see the ``references`` argument of :meth:`Pushrod.normalize <flask.ext.pushrod.Pushrod.normalize>`).
+
+The normalized response is wrapped in an envelope, in the style of JSON:API compound documents::
+
+    {
+        "data": {
+            "posts": [
+                {"title": "Spam", "author": {"$ref": "Author:5"}},
+                {"title": "Eggs", "author": {"$ref": "Author:5"}}
+            ]
+        },
+        "included": {
+            "Author:5": {"name": "Monty"}
+        }
+    }
+
+Objects are the same if they are the same instance, or if they declare the same ``__pushrod_key__`` (an attribute or method, such as a primary key). Only objects that normalize to containers are deduplicated, and only if they occur more than once. Objects with a declared key are named after it (``Author:5``), while other objects are numbered per type (``Author#1``).
+"""
+
+from .normalizers import _call_if_callable
+
+from types import NoneType, GeneratorType
+
+import datetime
+
+
+#: Types that are never deduplicated, since they are either cheap to repeat or can't be repeated.
+unreferenced_types = frozenset([
+    dict, list, tuple, str, unicode, int, long, float, bool, NoneType, GeneratorType,
+    datetime.datetime, datetime.date, datetime.time,
+])
+
+
+class References(object):
+    """
+    Remembers the normalized result of every object within a single response, and how many times each was used.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._uses = {}
+        self._names = {}
+        self._counters = {}
+        # The class that each unqualified type name was first used for
+        self._types = {}
+        # Keeps objects alive while their id() is used as the key
+        self._sources = []
+
+    def key(self, value):
+        """
+        :returns: The key that identifies value
+        """
+
+        declared = getattr(value, '__pushrod_key__', None)
+        if declared is not None:
+            key = (type(value), _call_if_callable(declared))
+        else:
+            key = id(value)
+            self._sources.append(value)
+
+        if key not in self._names:
+            self._names[key] = self._name(type(value), key[1] if declared is not None else None)
+
+        return key
+
+    def _name(self, cls, declared):
+        # Declared keys are named Type:key, and other objects are numbered per type as Type#N, so the two never collide.
+        # Classes that share a name (from different modules) are told apart by qualifying the later ones with their module.
+        type_name = cls.__name__
+        if self._types.setdefault(type_name, cls) is not cls:
+            type_name = u'%s.%s' % (cls.__module__, type_name)
+
+        if declared is not None:
+            return u'%s:%s' % (type_name, declared)
+
+        self._counters[type_name] = number = self._counters.get(type_name, 0) + 1
+        return u'%s#%i' % (type_name, number)
+
+    def get(self, key, default=None):
+        """
+        Looks up the result for key, counting it as another use.
+        """
+
+        if key not in self._results:
+            return default
+
+        self._uses[key] += 1
+        return self._results[key]
+
+    def add(self, key, result):
+        """
+        Remembers the result for key (which may be a container that is still being filled).
+        """
+
+        self._results[key] = result
+        self._uses.setdefault(key, 1)
+
+    def envelope(self, data):
+        """
+        Replaces every repeated container in data with a ``{"$ref": name}`` reference.
+
+        :returns: A ``{"data": data, "included": {name: container}}`` :obj:`dict`
+        """
+
+        repeated = dict((id(self._results[key]), self._names[key])
+                        for key, uses in self._uses.iteritems()
+                        if uses > 1 and type(self._results[key]) in (dict, list))
+        included = {}
+
+        stack = [data] if repeated and type(data) in (dict, list) else []
+        while stack:
+            container = stack.pop()
+            items = container.items() if type(container) is dict else enumerate(container)
+
+            for index, value in items:
+                if type(value) is not dict and type(value) is not list:
+                    continue
+
+                name = repeated.get(id(value))
+                if name is None:
+                    stack.append(value)
+                    continue
+
+                container[index] = {u'$ref': name}
+                if name not in included:
+                    included[name] = value
+                    stack.append(value)
+
+        return {u'data': data, u'included': included}
@@ -0,0 +1,149 @@
+"""
+Copy-on-write registries, used by :class:`~flask.ext.pushrod.Pushrod` for its renderers, parsers and normalizers.
+
+A registry holds an immutable snapshot (a plain :obj:`dict` which is never modified after it has been published). Changing the registry copies the snapshot, modifies the copy, and then swaps it in with a single assignment. That means readers never have to lock and always see a consistent view, even while other threads register things at runtime.
+
+Every change also bumps the registry's :attr:`~Registry.version`, so derived caches (such as the per-type normalizer resolution cache) can cheaply check whether they're stale.
+"""
+
+from collections import MutableMapping, MutableSequence
+
+import itertools
+import threading
+
+
+# Shared between all registries, so that a version number is never reused, even by a replacement registry
+_versions = itertools.count(1)
+
+
+class Registry(MutableMapping):
+    """
+    A copy-on-write mapping, which otherwise behaves like a :obj:`dict`.
+
+    .. note::
+       When reading both, read :attr:`version` before :attr:`snapshot`. The snapshot is always swapped in before the version is bumped, so the snapshot is at least as new as the version.
+    """
+
+    def __init__(self, items=()):
+        self._lock = threading.Lock()
+
+        #: The current contents, a :obj:`dict` that must not be modified.
+        self.snapshot = dict(items)
+        #: A number that changes every time the registry does.
+        self.version = next(_versions)
+
+    def _change(self, change):
+        # Calls change with a copy of the snapshot to modify, and then publishes it
+        with self._lock:
+            snapshot = dict(self.snapshot)
+            change(snapshot)
+            self.snapshot = snapshot
+            self.version = next(_versions)
+
+    def __getitem__(self, key):
+        return self.snapshot[key]
+
+    def get(self, key, default=None):
+        return self.snapshot.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.snapshot
+
+    def __iter__(self):
+        return iter(self.snapshot)
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def __setitem__(self, key, value):
+        self._change(lambda snapshot: snapshot.__setitem__(key, value))
+
+    def __delitem__(self, key):
+        self._change(lambda snapshot: snapshot.__delitem__(key))
+
+    def update(self, *args, **kwargs):
+        """
+        Like :meth:`dict.update`, but publishes all of the changes at once.
+        """
+
+        items = dict(*args, **kwargs)
+        self._change(lambda snapshot: snapshot.update(items))
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.snapshot)
+
+
+class OverrideRegistry(Registry):
+    """
+    A copy-on-write registry of lists, in the style of a :class:`~collections.defaultdict` of lists.
+
+    Indexing returns a mutable view of the list for that key (so ``overrides[cls].append(normalizer)`` keeps working), which publishes a new snapshot whenever it is changed. Internally the lists are stored as tuples, which is also what :meth:`get` returns.
+    """
+
+    def __getitem__(self, key):
+        return OverrideList(self, key)
+
+    def __setitem__(self, key, value):
+        value = tuple(value)
+
+        def change(snapshot):
+            if value:
+                snapshot[key] = value
+            else:
+                snapshot.pop(key, None)
+
+        self._change(change)
+
+
+class OverrideList(MutableSequence):
+    """
+    A view of the list stored under a key in an :class:`OverrideRegistry`.
+    """
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def _items(self):
+        return list(self.registry.get(self.key, ()))
+
+    def _modify(self, modify):
+        # The registry's lock isn't reentrant, so the whole read-modify-write happens inside of the change
+        key = self.key
+
+        def change(snapshot):
+            items = list(snapshot.get(key, ()))
+            modify(items)
+            if items:
+                snapshot[key] = tuple(items)
+            else:
+                snapshot.pop(key, None)
+
+        self.registry._change(change)
+
+    def __getitem__(self, index):
+        return self._items()[index]
+
+    def __len__(self):
+        return len(self.registry.get(self.key, ()))
+
+    def __setitem__(self, index, value):
+        self._modify(lambda items: items.__setitem__(index, value))
+
+    def __delitem__(self, index):
+        self._modify(lambda items: items.__delitem__(index))
+
+    def insert(self, index, value):
+        self._modify(lambda items: items.insert(index, value))
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, OverrideList)):
+            return NotImplemented
+        return self._items() == list(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(self._items())
@@ -1,5 +1,48 @@
+"""
+The bundled renderers are declared lazily (see :class:`LazyRenderer`), so that importing Flask-Pushrod doesn't import renderers that are never used.
+
+Third-party renderers can be made available by name (to the ``renderers`` argument of :class:`~flask.ext.pushrod.Pushrod`) through the ``flask_pushrod.renderers`` entry point group.
+"""
+
 from . import base
 
-from .base import UnrenderedResponse, RendererNotFound, renderer
-from .json import json_renderer
-from .jinja2 import jinja2_renderer
+from .base import UnrenderedResponse, RendererNotFound, LazyRenderer, renderer
+
+
+#: The entry point group searched for renderers that aren't bundled.
+entry_point_group = 'flask_pushrod.renderers'
+
+json_renderer = LazyRenderer('flask_pushrod.renderers.json:json_renderer', 'json', 'application/json')
+jinja2_renderer = LazyRenderer('flask_pushrod.renderers.jinja2:jinja2_renderer', 'html', 'text/html')
+csv_renderer = LazyRenderer('flask_pushrod.renderers.csv:csv_renderer', 'csv', 'text/csv')
+tsv_renderer = LazyRenderer('flask_pushrod.renderers.csv:tsv_renderer', 'tsv', 'text/tab-separated-values')
+
+#: The bundled renderers, keyed by the name used to refer to them in the ``renderers`` argument of :class:`~flask.ext.pushrod.Pushrod`.
+bundled_renderers = {
+    'json': json_renderer,
+    'jinja2': jinja2_renderer,
+    'csv': csv_renderer,
+    'tsv': tsv_renderer,
+}
+
+
+def get_renderer(name):
+    """
+    Looks up a renderer by name, first among :data:`bundled_renderers` and then among the ``flask_pushrod.renderers`` entry points.
+
+    .. note::
+       Bundled renderers are returned as :class:`LazyRenderer` declarations, while entry points have to be loaded immediately (since that's the only way to find out the renderer's names and MIME types).
+
+    :throws LookupError: If no renderer could be found
+    """
+
+    if name in bundled_renderers:
+        return bundled_renderers[name]
+
+    # pkg_resources is slow to import, so only pay for it when it's needed
+    import pkg_resources
+
+    for entry_point in pkg_resources.iter_entry_points(entry_point_group, name):
+        return entry_point.load()
+
+    raise LookupError(u"No renderer named '%s' could be found" % name)
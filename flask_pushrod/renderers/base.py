@@ -1,6 +1,9 @@
 from werkzeug.exceptions import NotAcceptable
+from werkzeug.utils import import_string
 
-from flask import current_app, Response
+from flask import current_app
+
+from ..response import PushrodResponse
 
 from functools import wraps
 
@@ -10,17 +13,22 @@ class UnrenderedResponse(object):
     Holds basic response data from the view function until it is processed by the renderer.
     """
 
-    #: The class to construct with the rendered response, defaults to :class:`flask.Response`.
-    rendered_class = Response
+    #: The class to construct with the rendered response, defaults to :class:`~flask.ext.pushrod.response.PushrodResponse` (a faster :class:`flask.Response`).
+    rendered_class = PushrodResponse
+
+    #: If True then the response is trusted to already be normalized (consisting only of :obj:`dicts <dict>`, :obj:`lists <list>`, strings, numbers, booleans and :obj:`None`), so renderers pass it straight to the encoder instead of normalizing it.
+    #: That also means that the layout and reference options don't apply. While the app is in debug mode the claim is checked by :func:`~flask.ext.pushrod.normalizers.check_native`.
+    native = False
 
-    def __init__(self, response=None, status=None, headers=None):
+    def __init__(self, response=None, status=None, headers=None, native=False):
         self.response = response
         self.status = status
         self.headers = headers
+        self.native = native
 
     def rendered(self, rendered_response, mime_type):
         """
-        Constructs a :attr:`rendered_class` (:class:`flask.Response` by default) based on the response parameters.
+        Constructs a :attr:`rendered_class` (:class:`~flask.ext.pushrod.response.PushrodResponse` by default) based on the response parameters.
         """
 
         return self.rendered_class(rendered_response,
@@ -37,35 +45,97 @@ def renderer(name=None, mime_type=None, normalize=True):
 
     :param name: A :obj:`basestring` or a tuple of basestrings to match against when explicitly requested in the query string
     :param mime_type: A :obj:`basestring` or a tuple of basestrings to match against against when using HTTP content negotiation
-    :param normalize: If True then the unrendered response will be passed through :meth:`flask.ext.pushrod.Pushrod.normalize`
-    """
+    :param normalize: If True then the unrendered response will be passed through :meth:`flask.ext.pushrod.Pushrod.normalize`, if ``'lazy'`` then it is normalized lazily (see the ``lazy`` argument of :meth:`~flask.ext.pushrod.Pushrod.normalize`), which is useful for renderers that only read a part of the response
 
-    if not name:  # pragma: no cover
-        name = ()
-    if isinstance(name, basestring):
-        name = (name,)
+    .. note::
+       The normalize argument declares which form of the response the renderer takes (available as its ``renderer_normalize`` attribute). :meth:`~flask.ext.pushrod.Pushrod.render_response` normalizes the response at most once per form, and passes the same result to every renderer that takes that form, so falling back from one renderer to another doesn't normalize the response again. Renderers must not modify the response they are given.
+    """
 
-    if not mime_type:  # pragma: no cover
-        mime_type = ()
-    if isinstance(mime_type, basestring):
-        mime_type = (mime_type,)
+    name = _to_tuple(name)
+    mime_type = _to_tuple(mime_type)
 
     def decorator(f):
         f._is_pushrod_renderer = True
         f.renderer_names = name
         f.renderer_mime_types = mime_type
+        f.renderer_normalize = normalize
+        f.import_name = '%s:%s' % (f.__module__, f.__name__)
 
         @wraps(f)
         def wrapper(unrendered, **kwargs):
-            if normalize:
-                unrendered.response = current_app.extensions['pushrod'].normalize(unrendered.response)
-            return f(unrendered, **kwargs)
+            pushrod = current_app.extensions['pushrod']
+            renderer_name = name[0] if name else None
+
+            if normalize and not unrendered.native:
+                unrendered.response = pushrod._normalize_response(unrendered.response, normalize == 'lazy', renderer_name)
+
+            with pushrod.trace('pushrod.render', renderer=renderer_name):
+                return f(unrendered, **kwargs)
 
         return wrapper
 
     return decorator
 
 
+def _to_tuple(x):
+    if not x:  # pragma: no cover
+        return ()
+    if isinstance(x, basestring):
+        return (x,)
+    return x
+
+
+class LazyRenderer(object):
+    """
+    Declares a renderer without importing it, so that it can be registered (and negotiated) before its module is loaded. The renderer is imported the first time it is actually called.
+
+    Comparing a :class:`LazyRenderer` to the renderer it declares returns True.
+
+    :param import_name: The renderer's import path, in the form ``module:name``
+    :param name: The renderer's names, must match the ones passed to :func:`renderer`
+    :param mime_type: The renderer's MIME types, must match the ones passed to :func:`renderer`
+    """
+
+    _is_pushrod_renderer = True
+
+    def __init__(self, import_name, name=None, mime_type=None):
+        self.import_name = import_name
+        self.renderer_names = _to_tuple(name)
+        self.renderer_mime_types = _to_tuple(mime_type)
+        self._renderer = None
+
+    def resolve(self):
+        """
+        Imports the declared renderer (if it hasn't already been imported).
+        """
+
+        if self._renderer is None:
+            self._renderer = import_string(self.import_name)
+        return self._renderer
+
+    def __call__(self, unrendered, **kwargs):
+        return (self._renderer or self.resolve())(unrendered, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyRenderer):
+            other = other.resolve()
+        return self.resolve() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.resolve())
+
+    def __repr__(self):
+        return '<LazyRenderer %s>' % self.import_name
+
+
 class RendererNotFound(NotAcceptable):
     """
     Thrown when no acceptable renderer can be found, see :meth:`flask.ext.pushrod.Pushrod.get_renderers_for_request`.
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+
+from .base import renderer
+from .json import dumps
+from ..raw import RawJSON
+
+from StringIO import StringIO
+
+import csv
+
+import flask
+
+
+def flatten_record(record, prefix=u''):
+    """
+    Flattens a normalized record into a single level, nested dicts are flattened into dotted names (so ``{"author": {"name": "Monty"}}`` becomes ``{"author.name": "Monty"}``), and lists are encoded as JSON.
+
+    :returns: :obj:`dict`
+    """
+
+    flattened = {}
+    stack = [(prefix, record)]
+
+    while stack:
+        prefix, value = stack.pop()
+
+        if isinstance(value, dict):
+            for key, child in value.iteritems():
+                stack.append((u'%s.%s' % (prefix, key) if prefix else key, child))
+        else:
+            flattened[prefix] = value
+
+    return flattened
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, RawJSON):
+        return value.json.encode('utf-8') if isinstance(value.json, unicode) else value.json
+    if isinstance(value, (list, tuple)):
+        return dumps(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return unicode(value).encode('utf-8')
+
+
+def iter_rows(records, pushrod, columns=None, dialect=csv.excel, chunk_size=100, budget=None):
+    """
+    Normalizes and writes records one by one, yielding the encoded rows in chunks, so that memory usage stays constant regardless of how many records there are.
+
+    :param records: An iterable (such as a generator) of records, each record is :meth:`normalized <flask.ext.pushrod.Pushrod.normalize>` (and then :func:`flattened <flatten_record>`) separately
+    :param pushrod: The :class:`~flask.ext.pushrod.Pushrod` instance to normalize with
+    :param columns: The (dotted) column names, inferred from the first record (in sorted order) if not given. Columns that a record lacks are left empty, and values that aren't in a column are dropped
+    :param dialect: The :mod:`csv` dialect to write
+    :param chunk_size: How many rows to write per chunk
+    :param budget: The :class:`~flask.ext.pushrod.budget.Budget` of the response being rendered, which the records are normalized within (since the rows are usually only written after :meth:`~flask.ext.pushrod.Pushrod.render_response` has returned)
+    """
+
+    buffer = StringIO()
+    writer = csv.writer(buffer, dialect)
+    header_written = False
+
+    for i, record in enumerate(records):
+        with pushrod._resume_budget(budget, 1):
+            record = flatten_record(pushrod.normalize(record))
+
+        if not header_written:
+            if columns is None:
+                columns = sorted(record)
+            writer.writerow([_cell(column) for column in columns])
+            header_written = True
+
+        writer.writerow([_cell(record.get(column)) for column in columns])
+
+        if not (i + 1) % chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if not header_written and columns:
+        writer.writerow([_cell(column) for column in columns])
+
+    chunk = buffer.getvalue()
+    if chunk:
+        yield chunk
+
+
+def _render_table(unrendered, mime_type, dialect, columns, records_key, chunk_size):
+    records = unrendered.response
+
+    if isinstance(records, dict):
+        if records_key is None or records_key not in records:
+            return NotImplemented
+        records = records[records_key]
+
+    if isinstance(records, basestring) or not hasattr(records, '__iter__'):
+        return NotImplemented
+
+    pushrod = flask.current_app.extensions['pushrod']
+    rows = iter_rows(records, pushrod, columns, dialect, chunk_size, getattr(pushrod._local, 'budget', None))
+    return unrendered.rendered(flask.stream_with_context(rows), mime_type)
+
+
+@renderer('csv', 'text/csv', normalize=False)
+def csv_renderer(unrendered, csv_columns=None, csv_records_key=None, csv_chunk_size=100, **kwargs):
+    """
+    Renders a list (or generator) of records as CSV, streaming the rows as they are normalized.
+
+    Each record is normalized separately (so a generator is never consumed up front), and flattened using :func:`flatten_record`.
+
+    :param csv_columns: The (dotted) column names, inferred from the first record if not given (see :func:`iter_rows`)
+    :param csv_records_key: If the response is a :obj:`dict` then the records are read from this key, the renderer declines if it isn't given
+    :param csv_chunk_size: How many rows to send per chunk
+
+    :Renderer MIME type triggers: - text/csv
+    :Renderer name triggers: - csv
+    """
+
+    return _render_table(unrendered, 'text/csv', csv.excel, csv_columns, csv_records_key, csv_chunk_size)
+
+
+@renderer('tsv', 'text/tab-separated-values', normalize=False)
+def tsv_renderer(unrendered, csv_columns=None, csv_records_key=None, csv_chunk_size=100, **kwargs):
+    """
+    Like :func:`csv_renderer`, but separates the values by tabs.
+
+    :Renderer MIME type triggers: - text/tab-separated-values
+    :Renderer name triggers: - tsv
+    """
+
+    return _render_table(unrendered, 'text/tab-separated-values', csv.excel_tab, csv_columns, csv_records_key, csv_chunk_size)
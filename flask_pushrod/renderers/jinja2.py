@@ -3,21 +3,138 @@ from __future__ import absolute_import
 
 from .base import renderer
 
+from jinja2 import nodes
+from jinja2.ext import Extension
+
 import flask
 
 
+def get_template(jinja_template):
+    """
+    Looks up a Jinja2 :class:`~jinja2.Template` in the current app's environment, caching it in :attr:`Pushrod.template_cache <flask.ext.pushrod.Pushrod.template_cache>`.
+
+    .. note::
+       The cache is bypassed while the app is in debug mode, so that template changes are still picked up without restarting.
+
+    :param jinja_template: A template name, or a list of template names (the first one that exists is used)
+    """
+
+    app = flask.current_app
+    jinja_env = app.jinja_env
+
+    if app.debug:
+        return jinja_env.get_or_select_template(jinja_template)
+
+    if isinstance(jinja_template, list):
+        jinja_template = tuple(jinja_template)
+
+    cache = app.extensions['pushrod'].template_cache
+    key = (jinja_env, jinja_template)
+
+    template = cache.get(key)
+    if template is None:
+        template = jinja_env.get_or_select_template(jinja_template)
+        cache.set(key, template)
+
+    return template
+
+
+def stream_template(template, context, buffer_size=5):
+    """
+    Like :func:`flask.render_template`, but returns an iterator which renders the template piece by piece (see :meth:`jinja2.Template.stream`).
+
+    .. note::
+       :data:`flask.template_rendered` is sent once the whole template has been rendered, rather than when this is called.
+
+    :param template: The :class:`~jinja2.Template` to render
+    :param context: The template context
+    :param buffer_size: How many template events to buffer before yielding (see :meth:`jinja2.environment.TemplateStream.enable_buffering`), :obj:`None` disables buffering
+    """
+
+    app = flask.current_app._get_current_object()
+    app.update_template_context(context)
+
+    stream = template.stream(context)
+    if buffer_size:
+        stream.enable_buffering(buffer_size)
+
+    def generate():
+        for chunk in stream:
+            yield chunk
+        flask.template_rendered.send(app, template=template, context=context)
+
+    return flask.stream_with_context(generate())
+
+
+class FragmentCacheExtension(Extension):
+    """
+    A Jinja2 extension that caches rendered template fragments in :attr:`Pushrod.fragment_cache <flask.ext.pushrod.Pushrod.fragment_cache>`.
+
+    It is added to the app's Jinja2 environment by :meth:`Pushrod.init_app <flask.ext.pushrod.Pushrod.init_app>` whenever :func:`jinja2_renderer` is registered, and is used like this:
+
+    .. code-block:: html+jinja
+
+       {% pushrodcache "author-%i" % author.id, 600 %}
+           <div class="author">{{ author.name }}</div>
+       {% endpushrodcache %}
+
+    The timeout (in seconds) is optional, and defaults to the cache's default timeout.
+    """
+
+    tags = set(['pushrodcache'])
+
+    #: The prefix to prepend to all fragment keys.
+    key_prefix = u'pushrod-fragment:'
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+
+        body = parser.parse_statements(['name:endpushrodcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_fragment', args), [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, key, timeout, caller):
+        cache = flask.current_app.extensions['pushrod'].fragment_cache
+        key = u'%s%s' % (self.key_prefix, key)
+
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(key, fragment, timeout)
+
+        return fragment
+
+
 @renderer('html', 'text/html', normalize=False)
-def jinja2_renderer(unrendered, jinja_template=None, **kwargs):
+def jinja2_renderer(unrendered, jinja_template=None, jinja_stream=False, jinja_buffer_size=5, **kwargs):
     """
     Renders a response using :func:`flask.render_template`.
 
+    The resolved :class:`~jinja2.Template` is cached by name (see :func:`get_template`).
+
+    :param jinja_template: The template name (or list of template names) to render, the renderer declines if not given
+    :param jinja_stream: If True then the template is streamed to the client while it is being rendered (see :func:`stream_template`)
+    :param jinja_buffer_size: How many template events to buffer before flushing them to the client when streaming
+
     :Renderer MIME type triggers: - text/html
     :Renderer name triggers: - html
     """
 
-    if jinja_template:
+    if not jinja_template:
+        return NotImplemented
+
+    template = get_template(jinja_template)
+
+    if jinja_stream:
         return unrendered.rendered(
-            flask.render_template(jinja_template, **unrendered.response),
+            stream_template(template, dict(unrendered.response), jinja_buffer_size),
             'text/html')
     else:
-        return NotImplemented
+        return unrendered.rendered(
+            flask.render_template(template, **unrendered.response),
+            'text/html')
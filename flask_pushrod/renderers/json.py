@@ -2,8 +2,11 @@ from __future__ import absolute_import
 
 
 from .base import renderer
+from ..raw import RawJSON
 
 import json
+import os
+import re
 
 
 @renderer('json', 'application/json', normalize=True)
@@ -11,9 +14,39 @@ def json_renderer(unrendered, **kwargs):
     """
     Renders a response using :func:`json.dumps`.
 
+    :class:`~flask.ext.pushrod.raw.RawJSON` values are spliced into the output verbatim.
+
     :Renderer MIME type triggers: - application/json
     :Renderer name triggers: - json
     """
     return unrendered.rendered(
-        json.dumps(unrendered.response),
+        dumps(unrendered.response),
         'application/json')
+
+
+def dumps(obj):
+    """
+    Like :func:`json.dumps`, but splices :class:`~flask.ext.pushrod.raw.RawJSON` values into the output verbatim.
+    """
+
+    raw = []
+
+    def default(o):
+        if not isinstance(o, RawJSON):
+            raise TypeError(repr(o) + " is not JSON serializable")
+
+        if not raw:
+            # A random placeholder prefix, so that it can't collide with a string in the response
+            raw.append(os.urandom(8).encode('hex'))
+        raw.append(o.json)
+        return u'__pushrod_raw_%s_%i__' % (raw[0], len(raw) - 1)
+
+    dumped = json.dumps(obj, default=default)
+    if not raw:
+        return dumped
+
+    def splice(match):
+        fragment = raw[int(match.group(1))]
+        return fragment.encode('utf-8') if isinstance(fragment, unicode) else fragment
+
+    return re.sub(r'"__pushrod_raw_%s_(\d+)__"' % raw[0], splice, dumped)
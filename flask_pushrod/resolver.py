@@ -1,24 +1,59 @@
 from flask import current_app, request as current_request
 from werkzeug.wrappers import BaseResponse
+from werkzeug.exceptions import BadRequest
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_set_header, quote_header_value, quote_etag
+from werkzeug.wsgi import wrap_file
 
-from . import renderers as _renderers, normalizers
+from . import renderers as _renderers, parsers as _parsers, normalizers, memory, patch
+from .cache import LRUCache
 from .renderers import RendererNotFound, UnrenderedResponse
+from .parsers import ParserNotFound
+from .lazy import LazyNormalizer
+from .schema import Schema
+from .budget import Budget
+from .registry import Registry, OverrideRegistry
+from .tracing import no_span
+from .raw import RawJSON
+from .references import References, unreferenced_types
+from .normalizers import _call_if_callable
+from .signals import response_memory_measured
 
 from functools import wraps
-from collections import defaultdict
+from operator import itemgetter
+from contextlib import contextmanager
 
+import copy
+import hashlib
+import io
+import json
 import logging
+import mmap
+import os
+import threading
 
 import datetime
 
 from types import NoneType, GeneratorType
 
 
+_pending = object()
+
+_layouts = ('records', 'columns')
+
+# Patches apply to the JSON document, so they are based on (and result in) the versions of the JSON representation
+_patch_variant = u'json'
+
+_jinja2_renderer = 'flask_pushrod.renderers.jinja2:jinja2_renderer'
+_fragment_cache_extension = 'flask_pushrod.renderers.jinja2.FragmentCacheExtension'
+
+
 class Pushrod(object):
     """
     The main resolver class for Pushrod.
 
-    :param renderers: A tuple of renderers that are registered immediately (can also be strings, which are currently expanded to flask.ext.pushrod.renderers.%s_renderer)
+    :param renderers: A tuple of renderers that are registered immediately (can also be strings, which are looked up using :func:`flask.ext.pushrod.renderers.get_renderer`)
+    :param parsers: A tuple of request body parsers that are registered immediately (can also be strings, which are currently expanded to flask.ext.pushrod.parsers.%s_parser)
     """
 
     #: The query string argument checked for an explicit renderer (to override header-based content type negotiation).
@@ -27,6 +62,13 @@ class Pushrod(object):
     #:    This is set on the class level, not the instance level.
     format_arg_name = "format"
 
+    #: The query string argument checked for the layout of record lists (see the ``layout`` argument of :meth:`normalize`), which overrides the view's layout.
+    #: It's only read when the response is normalized, and values that aren't a known layout are ignored, so apps can still use the argument for other purposes.
+    #:
+    #: .. note::
+    #:    This is set on the class level, not the instance level.
+    layout_arg_name = "layout"
+
     @property
     def logger(self):
         """
@@ -46,18 +88,25 @@ class Pushrod(object):
         else:
             return logging
 
-    def __init__(self, app=None, renderers=('json', 'jinja2',), default_renderer='html'):
+    def __init__(self, app=None, renderers=('json', 'jinja2',), default_renderer='html', parsers=('json', 'ndjson', 'form', 'msgpack')):
+        # All registries are copy-on-write (see flask.ext.pushrod.registry), so that they can be read without locking
+
         #: The renderers keyed by MIME type.
-        self.mime_type_renderers = {}
+        self.mime_type_renderers = Registry()
         #: The renderers keyed by output format name (such as html).
-        self.named_renderers = {}
+        self.named_renderers = Registry()
+
+        #: The request body parsers keyed by MIME type.
+        self.mime_type_parsers = Registry()
+        #: The request body parsers keyed by name.
+        self.named_parsers = Registry()
 
         #: Hooks for overriding a class' normalizer, even if they explicitly define one.
         #:
-        #: All items should be lists of callables. All values default to an empty list.
-        self.normalizer_overrides = defaultdict(lambda: [])
+        #: All items should be lists of callables. All values default to an empty list (see :class:`~flask.ext.pushrod.registry.OverrideRegistry`).
+        self.normalizer_overrides = OverrideRegistry()
         #: Hooks for providing a class with a fallback normalizer, which is called only if it doesn't define one. All items should be callables.
-        self.normalizers = {
+        self.normalizers = Registry({
             basestring: normalizers.normalize_basestring,
             list: normalizers.normalize_iterable,
             tuple: normalizers.normalize_iterable,
@@ -68,20 +117,68 @@ class Pushrod(object):
             float: normalizers.normalize_float,
             bool: normalizers.normalize_bool,
             NoneType: normalizers.normalize_none,
+            RawJSON: normalizers.normalize_raw_json,
             datetime.datetime: normalizers.normalize_basestring,
             datetime.date: normalizers.normalize_basestring,
             datetime.time: normalizers.normalize_basestring,
-        }
+        })
+        # The resolved normalizers per type, see _resolutions
+        self._resolution_cache = (None, {})
+        #: Loaders for normalizers of optional libraries, keyed by top-level module name (see :data:`~flask.ext.pushrod.normalizers.optional_normalizers`).
+        #: Each loader is called (and removed) the first time a value without a normalizer is found in that module, so the libraries are never imported by Pushrod itself.
+        self.optional_normalizers = dict(normalizers.optional_normalizers)
+
+        #: How :func:`~flask.ext.pushrod.normalizers.normalize_pandas_dataframe` lays out data frames, either ``records`` or ``columns``.
+        self.dataframe_layout = 'records'
+
+        #: All :class:`schemas <flask.ext.pushrod.schema.Schema>` declared using :meth:`schema`.
+        self.schemas = []
+
+        #: Resolved Jinja2 templates, keyed by (environment, template name), see :func:`~flask.ext.pushrod.renderers.jinja2.get_template`.
+        self.template_cache = LRUCache(threshold=500, default_timeout=0)
+        #: The cache used for ``{% pushrodcache %}`` template fragments (see :class:`~flask.ext.pushrod.renderers.jinja2.FragmentCacheExtension`), can be replaced by any cache with the same API (see :mod:`flask.ext.pushrod.cache`).
+        self.fragment_cache = LRUCache()
+        #: The cache that recent normalized versions of delta-enabled responses are kept in (see :mod:`flask.ext.pushrod.patch`), keyed by their path and ETag.
+        #: Like :attr:`fragment_cache` it can be replaced by any cache with the same API, its size and timeout bound which versions clients can get a patch from.
+        self.delta_store = LRUCache(threshold=100)
+
+        #: If True then :meth:`render_response` measures how much memory normalizing and rendering each response takes, see :mod:`flask.ext.pushrod.memory`.
+        #: The results are sent through :data:`~flask.ext.pushrod.signals.response_memory_measured`.
+        self.memory_accounting = False
+        #: If set (to a byte count) while :attr:`memory_accounting` is enabled, then responses whose memory usage peaks at least this much above where it started are logged as warnings, along with their endpoint.
+        self.memory_threshold = None
+
+        #: The maximum number of values that may be normalized for a single response, :obj:`None` means unlimited (see :mod:`flask.ext.pushrod.budget`).
+        self.max_elements = None
+        #: The maximum container nesting depth of a single response, :obj:`None` means unlimited.
+        self.max_depth = None
+        #: The maximum size (in bytes) of a single rendered response body, :obj:`None` means unlimited.
+        self.max_output_bytes = None
+        #: The maximum number of seconds that normalizing and rendering a single response may take, :obj:`None` means unlimited.
+        self.render_timeout = None
+        # Per-thread state of the response being rendered (its budget and layout)
+        self._local = threading.local()
+
+        #: The :class:`~flask.ext.pushrod.tracing.Tracer` that :func:`pushrod_view` requests are traced with, :obj:`None` disables tracing.
+        self.tracer = None
+        #: If True (and :attr:`tracer` is set) then each top-level value of a response is normalized in its own ``pushrod.normalize_model`` span, which shows what kinds of values normalization time is spent on.
+        self.trace_model_types = False
 
         #: The current app, only set from the constructor, not if using :meth:`init_app`.
         self.app = app or None
 
         for renderer in renderers:
             if isinstance(renderer, basestring):
-                renderer = getattr(_renderers, '%s_renderer' % renderer)
+                renderer = _renderers.get_renderer(renderer)
 
             self.register_renderer(renderer)
 
+        for parser in parsers:
+            if isinstance(parser, basestring):
+                parser = getattr(_parsers, '%s_parser' % parser)
+
+            self.register_parser(parser)
+
         if isinstance(default_renderer, basestring):
             if default_renderer in self.named_renderers:
                 default_renderer = self.named_renderers[default_renderer]
@@ -96,9 +193,25 @@ class Pushrod(object):
     def init_app(self, app):
         """
         Registers the Pushrod resolver with the Flask app (can also be done by passing the app to the constructor).
+
+        If :func:`~flask.ext.pushrod.renderers.jinja2.jinja2_renderer` is registered then :class:`~flask.ext.pushrod.renderers.jinja2.FragmentCacheExtension` is also added to the app's Jinja2 environment.
         """
 
         app.extensions['pushrod'] = self
+        app.before_first_request(self.compile_schemas)
+
+        if any(getattr(renderer, 'import_name', None) == _jinja2_renderer for renderer in self.named_renderers.values()):
+            self._add_jinja_extensions(app)
+
+    def _add_jinja_extensions(self, app):
+        # The extension is referred to by name, so that the renderer module is only imported once Jinja2 is used
+        extensions = list(app.jinja_options.get('extensions', ()))
+        if _fragment_cache_extension not in extensions:
+            app.jinja_options = dict(app.jinja_options, extensions=extensions + [_fragment_cache_extension])
+
+        if 'jinja_env' in app.__dict__:
+            # The environment has already been created, so it won't pick up the new options
+            app.jinja_env.add_extension(_fragment_cache_extension)
 
     def register_renderer(self, renderer, default=False):
         """
@@ -108,11 +221,83 @@ class Pushrod(object):
         if not (hasattr(renderer, '_is_pushrod_renderer') and renderer._is_pushrod_renderer):
             raise TypeError(u'Got passed an invalid renderer')
 
-        for name in renderer.renderer_names:
-            self.named_renderers[name] = renderer
+        self.named_renderers.update((name, renderer) for name in renderer.renderer_names)
+        self.mime_type_renderers.update((mime_type, renderer) for mime_type in renderer.renderer_mime_types)
+
+        if self.app and getattr(renderer, 'import_name', None) == _jinja2_renderer:
+            self._add_jinja_extensions(self.app)
+
+    def register_parser(self, parser):
+        """
+        Registers a request body parser with the Pushrod resolver (can also be done by passing the parser to the constructor).
+        """
+
+        if not (hasattr(parser, '_is_pushrod_parser') and parser._is_pushrod_parser):
+            raise TypeError(u'Got passed an invalid parser')
+
+        self.named_parsers.update((name, parser) for name in parser.parser_names)
+        self.mime_type_parsers.update((mime_type, parser) for mime_type in parser.parser_mime_types)
+
+    def parse_request(self, request=None, stream=False, **parser_kwargs):
+        """
+        Parses the body of a Flask :class:`~flask.Request`, using the parser registered for its Content-Type.
+
+        :throws ParserNotFound: If no registered parser can handle the request's Content-Type
+        :throws werkzeug.exceptions.BadRequest: If the body is malformed (when streaming this is only raised while iterating)
+        :param request: The request to parse (defaults to :obj:`flask.request`)
+        :param stream: If True then an iterator over the records in the body is returned instead (for example the items of a JSON array, or the lines of an NDJSON body), so that large bodies can be consumed without holding all of them in memory
+        :param parser_kwargs: Any extra arguments to pass to the parser
+        """
+
+        if request is None:
+            request = current_request
+
+        parser = self.mime_type_parsers.get(request.mimetype)
+        if parser is None:
+            raise ParserNotFound()
+
+        try:
+            parsed = parser(request, stream=stream, **parser_kwargs)
+        except (ValueError, LookupError) as e:
+            raise BadRequest(u"The request body could not be parsed: %s" % e)
+
+        if parsed is NotImplemented:
+            raise ParserNotFound()
+
+        if stream:
+            return _iter_parsed(parsed)
+        else:
+            return parsed
+
+    def schema(self, cls, fields, override=False):
+        """
+        Declares a :class:`~flask.ext.pushrod.schema.Schema` for a class, which is compiled into a specialized normalizer and registered in :attr:`normalizers`.
+
+        The schema is compiled the first time it is used, or when :meth:`compile_schemas` is called (which happens automatically before the first request).
+
+        :param cls: The class to declare the schema for
+        :param fields: The fields to include, see :class:`~flask.ext.pushrod.schema.Schema`
+        :param override: If True then the schema is registered in :attr:`normalizer_overrides` instead, so that it also takes precedence over the class' own normalizers (such as ``__pushrod_fields__``)
+        :returns: The :class:`~flask.ext.pushrod.schema.Schema`
+        """
+
+        schema = Schema(cls, fields)
+
+        if override:
+            self.normalizer_overrides[cls].append(schema)
+        else:
+            self.normalizers[cls] = schema
+
+        self.schemas.append(schema)
+        return schema
+
+    def compile_schemas(self):
+        """
+        Compiles all declared :attr:`schemas` up front, so that the first requests don't have to pay for it.
+        """
 
-        for mime_type in renderer.renderer_mime_types:
-            self.mime_type_renderers[mime_type] = renderer
+        for schema in self.schemas:
+            schema.compile()
 
     def get_renderers_for_request(self, request=None):
         """
@@ -131,23 +316,20 @@ class Pushrod(object):
             request = current_request
 
         if self.format_arg_name in request.args:
-            renderer_name = request.args[self.format_arg_name]
-
-            if renderer_name in self.named_renderers:
-                return [self.named_renderers[renderer_name]]
-            else:
-                return []
+            renderer = self.named_renderers.get(request.args[self.format_arg_name])
+            return [renderer] if renderer is not None else []
 
-        matching_renderers = [self.mime_type_renderers[mime_type]
+        mime_type_renderers = self.mime_type_renderers.snapshot
+        matching_renderers = [mime_type_renderers[mime_type]
                                for mime_type in request.accept_mimetypes.itervalues()
-                               if mime_type in self.mime_type_renderers]
+                               if mime_type in mime_type_renderers]
 
         if self.default_renderer:
             matching_renderers.append(self.default_renderer)
 
         return matching_renderers
 
-    def render_response(self, response, renderer=None, renderer_kwargs=None):
+    def render_response(self, response, renderer=None, renderer_kwargs=None, layout=None, references=None, deltas=False, native=False):
         """
         Renders an unrendered response (a bare value, a (response, status, headers)-:obj:`tuple`, or an :class:`~flask.ext.pushrod.renderers.UnrenderedResponse` object).
 
@@ -155,20 +337,35 @@ class Pushrod(object):
         :param response: The response to render
         :param renderer: The renderer(s) to use (defaults to using :meth:`get_renderer_for_request`)
         :param renderer_kwargs: Any extra arguments to pass to the renderer
+        :param layout: The layout of record lists for renderers that normalize the response (see :meth:`normalize`), unless the :attr:`layout_arg_name` query string argument asks for another known layout
+        :param references: If True then renderers that normalize the response deduplicate repeated objects (see :meth:`normalize`)
+        :param deltas: If True then successful responses are tagged with an ETag (which differs per renderer), and clients that have an older version get an :rfc:`6902` JSON Patch instead of the full response when they accept one (see :mod:`flask.ext.pushrod.patch`). The response is normalized up front, and every renderer receives the normalized response
+        :param native: If True then the response is trusted to already be normalized (see :attr:`UnrenderedResponse.native <flask.ext.pushrod.renderers.UnrenderedResponse.native>`)
 
         .. note::
            For convenience, a bare string (:obj:`unicode`, :obj:`str`, or any other :obj:`basestring` derivative), or a derivative of :class:`werkzeug.wrappers.BaseResponse` (such as :class:`flask.Response`) is passed through unchanged.
+        .. note::
+           Files (including :class:`mmap.mmap` and other file-like objects) and buffers (:obj:`memoryview`, :obj:`buffer` and :obj:`bytearray`) are sent as they are, without being copied into a string first. Files are handed to the server's ``wsgi.file_wrapper`` (which may use ``sendfile``), and the Content-Length is set from the remaining size. The Content-Type defaults to ``application/octet-stream``, but can be set with the response's headers.
         .. note::
            A renderer may mark itself as unable to render a specific response by returning :obj:`None`, in which case the next possible renderer is attempted.
+        .. note::
+           If the renderer was negotiated using the Accept:-header (rather than passed explicitly or picked by the :attr:`format_arg_name` query string argument) then ``Accept`` is added to the response's Vary:-header, so that shared caches don't serve it for other content types.
+        .. note::
+           If any of :attr:`max_elements`, :attr:`max_depth`, :attr:`max_output_bytes` or :attr:`render_timeout` are set, then a :class:`~flask.ext.pushrod.budget.BudgetExceeded` error is raised as soon as the response exceeds them.
+        .. note::
+           If :attr:`memory_accounting` is enabled then normalizing and rendering the response is measured, but streamed responses are only measured up to the point where the stream is returned.
         """
 
         if renderer:
             if hasattr(renderer, "__iter__"):
-                renderers = renderer
+                renderers = list(renderer)
             else:
                 renderers = [renderer]
+            vary_accept = False
         else:
-            renderers = self.get_renderers_for_request()
+            with self.trace('pushrod.negotiate'):
+                renderers = self.get_renderers_for_request()
+            vary_accept = self.format_arg_name not in current_request.args
 
         if renderer_kwargs is None:
             renderer_kwargs = {}
@@ -181,18 +378,241 @@ class Pushrod(object):
         if isinstance(response, (basestring, BaseResponse)):
             return response
 
+        if isinstance(response, UnrenderedResponse) and _is_binary(response.response):
+            return _binary_response(response.response, response.status, response.headers)
+        elif _is_binary(response):
+            return _binary_response(response, status, headers)
+
         if not isinstance(response, UnrenderedResponse):
-            response = UnrenderedResponse(response, status, headers)
+            response = UnrenderedResponse(response, status, headers, native)
+        elif native:
+            response.native = True
 
-        for renderer in renderers:
-            rendered = renderer(response, **renderer_kwargs)
+        if response.native and current_app.debug:
+            normalizers.check_native(response.response)
 
-            if rendered is not NotImplemented:
-                return rendered
+        with self._measure_memory() as measurement:
+            with self._budget() as budget:
+                with self._output_options(layout, references):
+                    snapshot = None
+                    if deltas and response.status in (None, 200):
+                        snapshot = self._normalize_version(response)
+                        delta = self._delta_response(response, snapshot, renderers[0] if renderers else None)
+                        if delta is not None:
+                            return delta
+
+                    # The response normalized into each form that the renderers take, see _renderer_input
+                    inputs = {}
+                    for renderer in renderers:
+                        rendered = renderer(self._renderer_input(response, renderer, inputs), **renderer_kwargs)
+
+                        if rendered is not NotImplemented:
+                            if budget is not None and isinstance(rendered, BaseResponse):
+                                budget.limit_response(rendered)
+                            if measurement is not None:
+                                self._account_memory(renderer, measurement)
+                            if vary_accept and isinstance(rendered, BaseResponse):
+                                _add_vary(rendered.headers, 'Accept')
+                            if snapshot is not None and isinstance(rendered, BaseResponse):
+                                # Each renderer's representation has its own tag, so one is never taken for another
+                                tag = patch.version_tag(response.response, _renderer_name(renderer), snapshot)
+                                if current_request.if_none_match.contains(tag):
+                                    # Only possible if an earlier renderer declined
+                                    rendered.close()
+                                    return _not_modified(tag)
+                                rendered.headers['ETag'] = quote_etag(tag)
+                                _add_vary(rendered.headers, 'Accept')
+                            return rendered
 
         raise RendererNotFound()
 
-    def normalize(self, obj):
+    def _renderer_input(self, response, renderer, inputs):
+        # Returns the response in the form that the renderer takes (its normalize argument), normalizing it only the
+        # first time that each form is needed. The original response is left unchanged, so every form starts from it.
+        form = getattr(renderer, 'renderer_normalize', False)
+        if not form or response.native:
+            return response
+
+        if form not in inputs:
+            names = getattr(renderer, 'renderer_names', ())
+            unrendered = copy.copy(response)
+            with self._output_options(self._requested_layout()):
+                unrendered.response = self._normalize_response(response.response, form == 'lazy', names[0] if names else None)
+            unrendered.native = True
+            inputs[form] = unrendered
+
+        return inputs[form]
+
+    def _normalize_version(self, response):
+        # Normalizes the response (once, renderers skip it) and stores a snapshot of it as a version that later patches
+        # can be based on, keyed by the tag of its JSON representation. The snapshot is serialized, since the view may
+        # keep modifying a native response afterwards.
+        if not response.native:
+            response.response = self.normalize(response.response, layout=self._requested_layout())
+            response.native = True
+
+        snapshot = patch.snapshot(response.response)
+        self.delta_store.set(_delta_key(patch.version_tag(response.response, _patch_variant, snapshot)), snapshot)
+        return snapshot
+
+    def _delta_response(self, response, snapshot, renderer):
+        # Returns a 304 if the client already has the version that renderer (the preferred renderer) would send, a patch
+        # response if it has an older JSON version and accepts patches, or None
+        client_tags = current_request.if_none_match
+        if not client_tags:
+            return None
+
+        if renderer is not None:
+            tag = patch.version_tag(response.response, _renderer_name(renderer), snapshot)
+            if client_tags.contains(tag):
+                return _not_modified(tag)
+
+        if patch.patch_mime_type not in current_request.accept_mimetypes.itervalues():
+            return None
+
+        for client_tag in client_tags.as_set():
+            base = self.delta_store.get(_delta_key(client_tag))
+            if base is not None:
+                with self.trace('pushrod.render', renderer='json-patch'):
+                    operations = patch.diff(json.loads(base), json.loads(snapshot))
+                    rendered = response.rendered(json.dumps(operations), patch.patch_mime_type)
+                # The client ends up with the current JSON version
+                rendered.headers['ETag'] = quote_etag(patch.version_tag(response.response, _patch_variant, snapshot))
+                _add_vary(rendered.headers, 'Accept')
+                return rendered
+
+        return None
+
+    def trace(self, name, **attributes):
+        """
+        Starts a span using :attr:`tracer`.
+
+        :returns: A context manager, which ends the span when exited (and does nothing if tracing is disabled)
+        """
+
+        if self.tracer is None:
+            return no_span
+
+        return self.tracer.span(name, attributes)
+
+    def _normalize_response(self, response, lazy, renderer_name):
+        # Normalizes a response for a renderer, tracing it if enabled
+        if self.tracer is None:
+            return self.normalize(response, lazy=lazy)
+
+        with self.trace('pushrod.normalize', renderer=renderer_name):
+            if not (self.trace_model_types and not lazy and not getattr(self._local, 'use_references', False) and
+                    self._container_normalizer(response) is normalizers.normalize_dict):
+                return self.normalize(response, lazy=lazy)
+
+            # Mirrors normalize_dict, but one span per value
+            normalized = {}
+            with self._budget():
+                for key, value in response.items():
+                    with self.trace('pushrod.normalize_model', key=key, type=_model_type_name(value)):
+                        value = self.normalize(value)
+                    if value is not NotImplemented:
+                        normalized[self.normalize(unicode(key))] = value
+            return normalized
+
+    def _requested_layout(self):
+        # Returns the layout requested by the layout_arg_name query string argument, or None (also for unknown layouts,
+        # since the argument may mean something else to the app)
+        if current_request:
+            layout = current_request.args.get(self.layout_arg_name)
+            if layout in _layouts:
+                return layout
+        return None
+
+    @contextmanager
+    def _output_options(self, layout=None, references=None):
+        # Sets the output options for normalizing in the current thread, options that are None are left unchanged
+        if layout is not None and layout not in _layouts:
+            raise ValueError(u"Unknown layout '%s', expected one of: %s" % (layout, u', '.join(_layouts)))
+
+        local = self._local
+        previous = getattr(local, 'layout', None), getattr(local, 'use_references', False)
+        if layout is not None:
+            local.layout = layout
+        if references is not None:
+            local.use_references = references
+
+        try:
+            yield
+        finally:
+            local.layout, local.use_references = previous
+
+    @contextmanager
+    def _unrendered(self):
+        # Makes pushrod_view return responses unrendered in the current thread, for flask.ext.pushrod.batch
+        previous = getattr(self._local, 'unrendered', False)
+        self._local.unrendered = True
+        try:
+            yield
+        finally:
+            self._local.unrendered = previous
+
+    def _has_limits(self):
+        return not (self.max_elements is None and self.max_depth is None and
+                    self.max_output_bytes is None and self.render_timeout is None)
+
+    @contextmanager
+    def _budget(self):
+        # Starts a budget for the current thread if there are any limits and there isn't already one running,
+        # yields the running budget (or None if there are no limits)
+        budget = getattr(self._local, 'budget', None)
+        if budget is not None or not self._has_limits():
+            yield budget
+            return
+
+        budget = self._local.budget = Budget(self.max_elements, self.max_depth, self.max_output_bytes, self.render_timeout)
+        try:
+            yield budget
+        finally:
+            self._local.budget = None
+
+    @contextmanager
+    def _resume_budget(self, budget, depth=0):
+        # Makes a budget that was started earlier the running budget again (for normalizing while a response is
+        # streamed, after render_response has returned), continuing at the given depth
+        if budget is None or getattr(self._local, 'budget', None) is not None:
+            yield
+            return
+
+        self._local.budget = budget
+        budget.depth = depth
+        try:
+            yield
+        finally:
+            self._local.budget = None
+
+    @contextmanager
+    def _measure_memory(self):
+        # Yields a running memory.Measurement if memory accounting is enabled (otherwise None), which is finished when
+        # the block is left, even if it wasn't accounted for
+        if not self.memory_accounting:
+            yield None
+            return
+
+        measurement = memory.Measurement()
+        try:
+            yield measurement
+        finally:
+            measurement.finish()
+
+    def _account_memory(self, renderer, measurement):
+        peak, allocated = measurement.finish()
+        endpoint = current_request.endpoint if current_request else None
+        renderer_name = _renderer_name(renderer)
+
+        app = self.app or (current_app._get_current_object() if current_app else None)
+        response_memory_measured.send(app,
+                                      endpoint=endpoint, renderer=renderer_name, peak=peak, allocated=allocated)
+
+        if self.memory_threshold is not None and peak is not None and peak >= self.memory_threshold:
+            self.logger.warning(u"Rendering the endpoint '%s' as '%s' used up to %i bytes more memory than before", endpoint, renderer_name, peak)
+
+    def normalize(self, obj, lazy=False, layout=None, references=None):
         """
         Runs an object through the normalizer mechanism, with the goal of producing a value consisting only of "native types" (:obj:`unicode`, :obj:`int`, :obj:`long`, :obj:`float`, :obj:`dict`, :obj:`list`, etc).
 
@@ -203,43 +623,510 @@ class Pushrod(object):
 
         See :ref:`bundled-normalizers` for all default normalizers.
 
+        .. note::
+           The bundled :func:`~flask.ext.pushrod.normalizers.normalize_dict` and :func:`~flask.ext.pushrod.normalizers.normalize_iterable` normalizers, as well as ``__pushrod_fields__`` and ``__pushrod_field__``, are handled iteratively rather than recursively, so arbitrarily deep values can be normalized.
+        .. note::
+           A value that contains itself (such as an object whose ``__pushrod_fields__`` lead back to it) raises a :exc:`ValueError`, unless ``references`` is enabled and the repeated value is an object (rather than a :obj:`dict` or :obj:`list`), in which case it becomes a reference.
+
         :param obj: The object to normalize.
+        :param lazy: If True then dicts and iterables are returned as :class:`~flask.ext.pushrod.lazy.LazyDict` and :class:`~flask.ext.pushrod.lazy.LazyList` proxies, which only normalize the values that are actually accessed
+        :param layout: How lists of records are laid out, either ``records`` (the default, a list of dicts), or ``columns``, where lists of dicts that all have the same keys are turned into ``{"columns": [keys...], "rows": [[values...], ...]}``, so that the keys aren't repeated for every record (ignored when normalizing lazily).
+                       Defaults to the layout of the response being rendered, see :meth:`render_response`.
+        :param references: If True then objects that occur more than once are only included once, and referred to everywhere else, see :mod:`flask.ext.pushrod.references` (ignored when normalizing lazily).
+                           Defaults to the setting of the response being rendered, see :meth:`render_response`.
         """
 
-        for cls in type(obj).__mro__:
-            for override in self.normalizer_overrides[cls]:
-                attempt = override(obj, self)
-                if attempt is not NotImplemented:
-                    return attempt
+        if layout is not None or references is not None:
+            with self._output_options(layout, references):
+                return self.normalize(obj, lazy)
+
+        local = self._local
+        if getattr(local, 'budget', None) is None and self._has_limits():
+            with self._budget():
+                return self.normalize(obj, lazy)
+
+        if lazy:
+            return LazyNormalizer(self).normalize(obj)
+
+        if getattr(local, 'use_references', False) and getattr(local, 'references', None) is None:
+            # This is the outermost call, nested calls share its references
+            references = local.references = References()
+            try:
+                return references.envelope(self._normalize(obj))
+            finally:
+                local.references = None
+
+        return self._normalize(obj)
+
+    def _normalize(self, obj):
+        # Normalizes obj eagerly, using an explicit stack rather than recursion for the bundled container normalizers
+        # (normalize_dict and normalize_iterable) and __pushrod_fields__/__pushrod_field__, so that deep values
+        # neither hit the recursion limit nor pay for a Python call per level.
+        #
+        # Each stack frame is [result, iterator, pending key, is dict, reference key, sources], where sources are the
+        # values that the container was resolved from.
+        resolutions = self._resolutions()
+        normalize_dict = normalizers.normalize_dict
+        normalize_iterable = normalizers.normalize_iterable
+        pending = _pending
+        columns = getattr(self._local, 'layout', None) == 'columns'
+
+        # Keys can skip the resolution if unicode isn't handled specially
+        unicode_overrides, unicode_normalizers = self._resolution(unicode, resolutions)
+        plain_keys = not unicode_overrides and unicode_normalizers[:1] == (normalizers.normalize_basestring,)
+
+        # The budget is shared with any nested calls (from normalizers that call pushrod.normalize), which continue
+        # counting the depth from where they were called
+        budget = getattr(self._local, 'budget', None)
+        base_depth = budget.depth if budget is not None else 0
+
+        # Objects that were already normalized for this response are reused (see flask.ext.pushrod.references), the
+        # reference key is kept while the object is resolved (which may restart with a new value)
+        references = getattr(self._local, 'references', None)
+        reference_key = None
+
+        # The ids of the values currently being resolved (the sources of every frame on the stack, and of the current
+        # value), which would otherwise make a value that contains itself grow the stack forever. The sources are kept
+        # in the frames as well, so that their ids stay unique until they're done.
+        active = set()
+        sources = []
+
+        stack = []
+        value = obj
+
+        while True:
+            result = pending
+
+            if references is not None and reference_key is None and type(value) not in unreferenced_types:
+                reference_key = references.key(value)
+                result = references.get(reference_key, pending)
+                if result is not pending:
+                    reference_key = None
+
+            if result is pending:
+                try:
+                    type_overrides, type_normalizers = resolutions[type(value)]
+                except KeyError:
+                    type_overrides, type_normalizers = self._resolution(type(value), resolutions)
+
+                for override in type_overrides:
+                    attempt = override(value, self)
+                    if attempt is not NotImplemented:
+                        result = attempt
+                        break
+
+                if result is pending:
+                    if hasattr(value, '__pushrod_normalize__'):
+                        result = value.__pushrod_normalize__(self)
+                    elif hasattr(value, '__pushrod_fields__'):
+                        _enter(active, sources, value)
+                        fields = _call_if_callable(value.__pushrod_fields__)
+                        value = dict((name, getattr(value, name)) for name in fields)
+                        continue
+                    elif hasattr(value, '__pushrod_field__'):
+                        _enter(active, sources, value)
+                        value = getattr(value, _call_if_callable(value.__pushrod_field__))
+                        continue
+                    elif hasattr(value, '__pushrod_raw_json__'):
+                        result = RawJSON(_call_if_callable(value.__pushrod_raw_json__))
+
+                if result is pending or result is NotImplemented:
+                    result = NotImplemented
+
+                    for normalizer in type_normalizers:
+                        if normalizer is normalize_dict:
+                            value_id = id(value)
+                            if value_id in active:
+                                _circular(value)
+                            active.add(value_id)
+                            sources.append(value)
+                            stack.append([{}, iter(value.items()), None, True, None, sources])
+                            sources = []
+                            result = pending
+                            break
+                        elif normalizer is normalize_iterable:
+                            value_id = id(value)
+                            if value_id in active:
+                                _circular(value)
+                            active.add(value_id)
+                            sources.append(value)
+                            stack.append([[], iter(value), None, False, None, sources])
+                            sources = []
+                            result = pending
+                            break
+
+                        attempt = normalizer(value, self)
+                        if attempt is not NotImplemented:
+                            result = attempt
+                            break
+
+                    if result is NotImplemented and self._load_optional_normalizers(type(value)):
+                        resolutions = self._resolutions()
+                        continue
+
+                if reference_key is not None:
+                    if result is pending:
+                        # Dicts are remembered while they're still being filled, so that cycles also end up as references
+                        stack[-1][4] = reference_key
+                        if stack[-1][3]:
+                            references.add(reference_key, stack[-1][0])
+                    else:
+                        references.add(reference_key, result)
+                    reference_key = None
+
+            # Hand the result to the parent frame, and find the next value to normalize
+            while True:
+                if result is not pending:
+                    if sources:
+                        _leave(active, sources)
+                        sources = []
+                    if not stack:
+                        return result
+
+                    frame = stack[-1]
+                    if frame[3]:
+                        if result is not NotImplemented:
+                            frame[0][frame[2]] = result
+                    else:
+                        frame[0].append(result)
+
+                frame = stack[-1]
+                try:
+                    item = next(frame[1])
+                except StopIteration:
+                    stack.pop()
+                    _leave(active, frame[5])
+                    result = frame[0]
+                    if columns and not frame[3]:
+                        result = _columns_layout(result)
+                    if frame[4] is not None:
+                        references.add(frame[4], result)
+                    continue
+
+                if frame[3]:
+                    key, value = item
+                    frame[2] = unicode(key) if plain_keys else self.normalize(unicode(key))
+                else:
+                    value = item
+
+                if budget is not None:
+                    budget.step(base_depth + len(stack))
+                break
 
-        attempt = normalizers.normalize_object(obj, self)
+    def _resolve(self, obj, pushrod):
+        # Runs a single step of the normalizer resolution, pushrod is what is passed on to the normalizers (which is
+        # not self when normalizing lazily)
+        budget = getattr(self._local, 'budget', None)
+        if budget is not None:
+            budget.step(budget.depth)
+
+        type_overrides, type_normalizers = self._resolution(type(obj))
+
+        for override in type_overrides:
+            attempt = override(obj, pushrod)
+            if attempt is not NotImplemented:
+                return attempt
+
+        attempt = normalizers.normalize_object(obj, pushrod)
         if attempt is not NotImplemented:
             return attempt
 
-        for cls in type(obj).__mro__:
-            if cls in self.normalizers:
-                attempt = self.normalizers[cls](obj, self)
-                if attempt is not NotImplemented:
-                    return attempt
+        for normalizer in type_normalizers:
+            attempt = normalizer(obj, pushrod)
+            if attempt is not NotImplemented:
+                return attempt
+
+        if self._load_optional_normalizers(type(obj)):
+            return self._resolve(obj, pushrod)
 
         return NotImplemented
 
+    def _load_optional_normalizers(self, cls):
+        # Returns True if any normalizers were loaded
+        if not self.optional_normalizers:
+            return False
+
+        loader = self.optional_normalizers.pop(cls.__module__.split('.')[0], None)
+        if loader is None:
+            return False
+
+        self.normalizers.update(loader())
+        return True
+
+    def _container_normalizer(self, obj):
+        # Returns normalize_dict or normalize_iterable if that is what obj would end up being normalized by, otherwise None
+        type_overrides, type_normalizers = self._resolution(type(obj))
+
+        if type_overrides:
+            return None
+
+        if hasattr(obj, '__pushrod_normalize__') or hasattr(obj, '__pushrod_fields__') or hasattr(obj, '__pushrod_field__') or \
+                hasattr(obj, '__pushrod_raw_json__'):
+            return None
+
+        if type_normalizers and type_normalizers[0] in (normalizers.normalize_dict, normalizers.normalize_iterable):
+            return type_normalizers[0]
+
+        return None
+
+    def _resolutions(self):
+        # Returns the cache of resolved (overrides, normalizers) per type, which is started over whenever either registry
+        # has changed since it was built. The versions are read before the snapshots (in _resolution), so a stale
+        # resolution can only end up in a cache that is already outdated.
+        versions = (self.normalizer_overrides.version, self.normalizers.version)
+        cached_versions, resolutions = self._resolution_cache
+
+        if cached_versions != versions:
+            resolutions = {}
+            self._resolution_cache = (versions, resolutions)
+
+        return resolutions
+
+    def _resolution(self, cls, resolutions=None):
+        # Returns the overrides and normalizers that apply to cls, in MRO order
+        if resolutions is None:
+            resolutions = self._resolutions()
+
+        resolution = resolutions.get(cls)
+        if resolution is None:
+            overrides = self.normalizer_overrides.snapshot
+            registered = self.normalizers.snapshot
+            resolution = resolutions[cls] = (
+                tuple(override for parent in cls.__mro__ for override in overrides.get(parent, ())),
+                tuple(registered[parent] for parent in cls.__mro__ if parent in registered),
+            )
+
+        return resolution
+
+
+def _enter(active, sources, value):
+    # Marks value as being resolved by Pushrod._normalize
+    if id(value) in active:
+        _circular(value)
+    active.add(id(value))
+    sources.append(value)
+
+
+def _circular(value):
+    raise ValueError(u"Circular reference detected (a %s contains itself)" % type(value).__name__)
+
+
+def _leave(active, sources):
+    for source in sources:
+        active.discard(id(source))
+
+
+# Key views compare like sets without copying the keys, but only exist since Python 2.7
+_key_set = getattr(dict, 'viewkeys', frozenset)
 
-def pushrod_view(**renderer_kwargs):
+
+def _columns_layout(records):
+    # Turns a list of dicts with the same keys into {"columns": [...], "rows": [[...], ...]}, anything else is returned
+    # unchanged
+    if not records or type(records[0]) is not dict:
+        return records
+
+    keys = _key_set(records[0])
+    for record in records:
+        if type(record) is not dict or _key_set(record) != keys:
+            return records
+
+    columns = sorted(keys)
+    if len(columns) == 1:
+        column = columns[0]
+        rows = [[record[column]] for record in records]
+    else:
+        get_row = itemgetter(*columns)
+        rows = [list(get_row(record)) for record in records]
+
+    return {u'columns': columns, u'rows': rows}
+
+
+def _model_type_name(value):
+    if isinstance(value, (list, tuple)) and value:
+        return u'%s of %s' % (type(value).__name__, type(value[0]).__name__)
+    return type(value).__name__
+
+
+try:
+    _memoryview = memoryview
+except NameError:  # pragma: no cover
+    # Python 2.6, where buffer() is used instead
+    _memoryview = None
+
+_buffer_types = tuple(cls for cls in (_memoryview, buffer, bytearray) if cls is not None)
+
+
+def _is_file(value):
+    if isinstance(value, (file, io.IOBase, mmap.mmap)):
+        return True
+    return hasattr(value, 'read') and hasattr(value, 'seek') and hasattr(value, 'tell')
+
+
+def _is_binary(value):
+    return isinstance(value, _buffer_types) or _is_file(value)
+
+
+def _remaining_length(f):
+    # Returns the number of bytes left to read from f, or None if that can't be found out
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, EnvironmentError, ValueError, io.UnsupportedOperation):
+        pass
+
+    try:
+        position = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(position)
+        return end - position
+    except (AttributeError, EnvironmentError, ValueError):
+        return None
+
+
+def _iter_buffer(view, chunk_size=65536):
+    for start in xrange(0, len(view), chunk_size):
+        chunk = view[start:start + chunk_size]
+        # Slices of a buffer() are already strings
+        yield chunk if isinstance(chunk, str) else chunk.tobytes()
+
+
+def _binary_response(body, status, headers):
+    environ = current_request.environ if current_request else {}
+
+    if isinstance(body, _buffer_types):
+        if _memoryview is None:  # pragma: no cover
+            view = buffer(body)
+            length = len(view)
+        else:
+            view = _memoryview(body)
+            length = len(view) * view.itemsize
+        data = _iter_buffer(view)
+    else:
+        length = _remaining_length(body)
+        data = wrap_file(environ, body)
+
+    response = current_app.response_class(data, status, headers, direct_passthrough=True)
+    if headers is None or 'Content-Type' not in Headers(headers):
+        response.headers['Content-Type'] = 'application/octet-stream'
+    if length is not None:
+        response.headers['Content-Length'] = str(length)
+    return response
+
+
+def _iter_parsed(records):
+    try:
+        for record in records:
+            yield record
+    except (ValueError, LookupError) as e:
+        raise BadRequest(u"The request body could not be parsed: %s" % e)
+
+
+def _delta_key(tag):
+    # Versions are stored per path, so that a client can't be sent a patch against another resource's version
+    return 'pushrod-delta:%s' % hashlib.sha1('%s:%s' % (current_request.path.encode('utf-8'), tag)).hexdigest()
+
+
+def _renderer_name(renderer):
+    names = getattr(renderer, 'renderer_names', ())
+    return names[0] if names else None
+
+
+def _not_modified(tag):
+    return current_app.response_class(status=304, headers=[('ETag', quote_etag(tag)), ('Vary', 'Accept')])
+
+
+def _add_vary(headers, header):
+    vary = parse_set_header(headers.get('Vary'))
+    if header not in vary:
+        vary.add(header)
+        headers['Vary'] = vary.to_header()
+
+
+def _apply_cache_control(response, cache_control):
+    if 'Cache-Control' in response.headers or response.status_code >= 400:
+        return
+
+    directives = []
+    for name, value in sorted(cache_control.items()):
+        name = name.replace('_', '-')
+        if value is True:
+            directives.append(name)
+        elif value is not False and value is not None:
+            directives.append('%s=%s' % (name, quote_header_value(value)))
+
+    response.headers['Cache-Control'] = ', '.join(directives)
+
+
+def pushrod_view(static=False, cache_control=None, layout=None, references=None, deltas=False, native=False, static_threshold=500, **renderer_kwargs):
     """
     Decorator that wraps view functions and renders their responses through :meth:`flask.ext.pushrod.Pushrod.render_response`.
 
     .. note::
        Views should only return :obj:`dicts <dict>` or a type that :meth:`normalizes <Pushrod.normalize>` down to :obj:`dicts <dict>`.
 
+    :param static: If True then the view is assumed to always return the same response (for the same view arguments), so it is only called and rendered the first time each set of renderers is negotiated, and the rendered body, status and headers are served directly after that
+    :param cache_control: A :obj:`dict` of Cache-Control:-directives to add to successful responses (unless the view sets the header itself), such as ``{'public': True, 'max_age': 60, 'stale_while_revalidate': 30}``. Underscores are converted into dashes, :obj:`True` adds a bare directive, and :obj:`False` or :obj:`None` leaves it out
+    :param layout: The layout of record lists, such as ``columns`` (see :meth:`Pushrod.normalize`), the :attr:`~Pushrod.layout_arg_name` query string argument takes precedence
+    :param references: If True then repeated objects are only included once, and referred to everywhere else (see :mod:`flask.ext.pushrod.references`)
+    :param deltas: If True then clients that send the ETag of an older version of the response can get a JSON Patch to the current version instead (see :mod:`flask.ext.pushrod.patch`), can't be combined with static (since the result depends on the client's version)
+    :param native: If True then the view is trusted to return responses that are already normalized, which renderers then pass straight to the encoder (see :attr:`UnrenderedResponse.native <flask.ext.pushrod.renderers.UnrenderedResponse.native>`)
+    :param static_threshold: The maximum number of rendered responses that a static view keeps, once there are more the least recently used are evicted (and rendered again if they're requested again)
     :param renderer_kwargs: Any extra arguments to pass to the renderer
     """
 
+    if static and deltas:
+        raise ValueError(u"Static views can't send delta responses")
+
     def decorator(f):
+        if static:
+            rendered_responses = LRUCache(threshold=static_threshold, default_timeout=0)
+
         @wraps(f)
         def wrapper(*view_args, **view_kwargs):
-            response = f(*view_args, **view_kwargs)
-            return current_app.extensions['pushrod'].render_response(response, renderer_kwargs=renderer_kwargs)
+            pushrod = current_app.extensions['pushrod']
+
+            with pushrod.trace('pushrod.view', endpoint=current_request.endpoint):
+                return render(pushrod, view_args, view_kwargs)
+
+        def render(pushrod, view_args, view_kwargs):
+            if getattr(pushrod._local, 'unrendered', False):
+                with pushrod.trace('pushrod.view_function'):
+                    return f(*view_args, **view_kwargs)
+
+            if static:
+                rendered = render_static(pushrod, view_args, view_kwargs)
+            else:
+                with pushrod.trace('pushrod.view_function'):
+                    response = f(*view_args, **view_kwargs)
+                rendered = pushrod.render_response(response, renderer_kwargs=renderer_kwargs, layout=layout, references=references, deltas=deltas, native=native)
+
+            if cache_control and isinstance(rendered, BaseResponse):
+                _apply_cache_control(rendered, cache_control)
+
+            return rendered
+
+        def render_static(pushrod, view_args, view_kwargs):
+            renderers = tuple(pushrod.get_renderers_for_request())
+            explicit_format = pushrod.format_arg_name in current_request.args
+            explicit_layout = pushrod._requested_layout()
+            key = (pushrod, renderers, explicit_format, explicit_layout, view_args, tuple(sorted(view_kwargs.items())))
+
+            rendered = rendered_responses.get(key)
+            if rendered is None:
+                with pushrod.trace('pushrod.view_function'):
+                    response = f(*view_args, **view_kwargs)
+                # Don't pass the negotiated renderers on explicitly, since that is what decides whether Vary: Accept is added
+                rendered = pushrod.render_response(response, renderer_kwargs=renderer_kwargs, layout=layout, references=references, deltas=deltas, native=native)
+
+                if isinstance(rendered, BaseResponse):
+                    rendered = (rendered.data, rendered.status_code, rendered.headers.to_list())
+                rendered_responses.set(key, rendered)
+
+            if isinstance(rendered, tuple):
+                data, status, headers = rendered
+                return current_app.response_class(data, status, headers)
+            return rendered
 
         return wrapper
 
@@ -0,0 +1,50 @@
+"""
+The response class used for bodies rendered by Pushrod's own renderers (see :attr:`UnrenderedResponse.rendered_class <flask.ext.pushrod.renderers.UnrenderedResponse.rendered_class>`).
+"""
+
+from flask import Response
+from werkzeug.datastructures import Headers
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.utils import get_content_type
+
+
+class PushrodResponse(Response):
+    """
+    A :class:`flask.Response` that is cheaper to construct for fully rendered bodies.
+
+    When given a string body and a MIME type (which is how renderers construct it), the Content-Type (per MIME type) and status line (per status code) are looked up from caches, the body is stored without being measured again, and Content-Length is set directly (unless :attr:`~werkzeug.wrappers.BaseResponse.automatically_set_content_length` is disabled). Anything else (such as a streamed body) is handled by :class:`flask.Response` as usual.
+
+    The result is an ordinary :class:`flask.Response` (and :class:`~werkzeug.wrappers.BaseResponse`), so it can be modified afterwards like any other response.
+    """
+
+    # Content-Type header values keyed by (MIME type, charset), and status lines keyed by status code
+    _content_types = {}
+    _statuses = {}
+
+    def __init__(self, response=None, status=None, headers=None, mimetype=None, content_type=None, direct_passthrough=False):
+        if not (isinstance(response, basestring) and mimetype is not None and content_type is None and
+                not direct_passthrough and (status is None or isinstance(status, (int, long)))):
+            Response.__init__(self, response, status, headers, mimetype, content_type, direct_passthrough)
+            return
+
+        if isinstance(response, unicode):
+            response = response.encode(self.charset)
+
+        content_type = self._content_types.get((mimetype, self.charset))
+        if content_type is None:
+            content_type = self._content_types[mimetype, self.charset] = get_content_type(mimetype, self.charset)
+
+        if status is None:
+            status = 200
+        status_line = self._statuses.get(status)
+        if status_line is None:
+            status_line = self._statuses[status] = '%d %s' % (status, HTTP_STATUS_CODES.get(status, 'unknown').upper())
+
+        if not isinstance(headers, Headers):
+            headers = Headers(headers or ())
+        if self.automatically_set_content_length:
+            headers['Content-Length'] = str(len(response))
+
+        # The body is stored directly afterwards, instead of passing it to be measured again
+        Response.__init__(self, None, status_line, headers, content_type=content_type)
+        self.response = [response]
@@ -0,0 +1,128 @@
+"""
+Declarative schemas, which are compiled into specialized normalizers (see :meth:`flask.ext.pushrod.Pushrod.schema`).
+
+A compiled schema reads each field directly and applies its conversion inline, instead of going through the generic :func:`~flask.ext.pushrod.normalizers.normalize_object` and :func:`~flask.ext.pushrod.normalizers.normalize_dict` dispatch. For example, this schema::
+
+    pushrod.schema(Post, fields={
+        'id': int,
+        'title': unicode,
+        'author': None,
+    })
+
+compiles to roughly the following normalizer::
+
+    def normalize_Post(x, pushrod):
+        v0 = x.id
+        v1 = x.title
+        v2 = x.author
+        rv = {
+            u'id': None if v0 is None else int(v0),
+            u'title': None if v1 is None else unicode(v1),
+            u'author': pushrod.normalize(v2),
+        }
+        if rv[u'author'] is NotImplemented:
+            del rv[u'author']
+        return rv
+"""
+
+import datetime
+import keyword
+import re
+
+
+#: The types that are converted inline by calling the type on the value, :obj:`None` is passed through unconverted.
+typed_conversions = {
+    unicode: 'unicode',
+    str: 'unicode',
+    int: 'int',
+    long: 'long',
+    float: 'float',
+    bool: 'bool',
+    datetime.datetime: 'unicode',
+    datetime.date: 'unicode',
+    datetime.time: 'unicode',
+}
+
+_identifier = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class Schema(object):
+    """
+    A declared set of fields for a class, which is compiled into a normalizer the first time it is called (or when :meth:`compile` is called).
+
+    :param cls: The class that the schema describes
+    :param fields: Either a :obj:`dict` of field names to conversions, or a list of field names (which are then normalized generically).
+                   A conversion can be :obj:`None` (the value is passed through :meth:`~flask.ext.pushrod.Pushrod.normalize`), one of :data:`typed_conversions`, or a normalizer-style callable taking (value, pushrod).
+    """
+
+    def __init__(self, cls, fields):
+        if not isinstance(fields, dict):
+            fields = dict((name, None) for name in fields)
+
+        self.cls = cls
+        self.fields = fields
+        self.normalizer = None
+
+    def compile(self):
+        """
+        Compiles the schema into a normalizer (if it hasn't already been compiled).
+
+        :returns: The compiled normalizer, a callable taking (obj, pushrod)
+        """
+
+        if self.normalizer is None:
+            self.normalizer = compile_schema(self.cls, self.fields)
+        return self.normalizer
+
+    def __call__(self, obj, pushrod):
+        return (self.normalizer or self.compile())(obj, pushrod)
+
+    def __repr__(self):
+        return '<Schema for %r>' % self.cls
+
+
+def compile_schema(cls, fields):
+    """
+    Generates and compiles the source of a normalizer for ``cls``, see :class:`Schema` for the arguments.
+    """
+
+    namespace = {}
+    reads = []
+    items = []
+    checks = []
+
+    for i, (name, conversion) in enumerate(sorted(fields.items())):
+        var = 'v%i' % i
+        key = repr(unicode(name))
+
+        if _identifier.match(name) and not keyword.iskeyword(name):
+            reads.append('    %s = x.%s' % (var, name))
+        else:
+            reads.append('    %s = getattr(x, %r)' % (var, name))
+
+        if conversion is None:
+            items.append('        %s: pushrod.normalize(%s),' % (key, var))
+            checks.append('    if rv[%s] is NotImplemented:\n        del rv[%s]' % (key, key))
+        elif conversion in typed_conversions:
+            items.append('        %s: None if %s is None else %s(%s),' % (key, var, typed_conversions[conversion], var))
+        elif callable(conversion):
+            namespace['c%i' % i] = conversion
+            items.append('        %s: c%i(%s, pushrod),' % (key, i, var))
+            checks.append('    if rv[%s] is NotImplemented:\n        del rv[%s]' % (key, key))
+        else:
+            raise TypeError(u"Invalid conversion for the field '%s': %r" % (name, conversion))
+
+    function_name = 'normalize_%s' % cls.__name__ if _identifier.match(cls.__name__) else 'normalize_schema'
+    source = '\n'.join(
+        ['def %s(x, pushrod):' % function_name] +
+        reads +
+        ['    rv = {'] + items + ['    }'] +
+        checks +
+        ['    return rv'])
+
+    code = compile(source, '<pushrod schema for %s>' % cls.__name__, 'exec')
+    exec code in namespace
+
+    normalizer = namespace[function_name]
+    normalizer.source = source
+    return normalizer
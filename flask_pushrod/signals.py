@@ -0,0 +1,14 @@
+"""
+Signals sent by Pushrod, in the same style as :ref:`Flask's own signals <flask:signals>`.
+
+As with Flask, the signals are only usable if `blinker <http://pypi.python.org/pypi/blinker>`_ is installed, otherwise sending them does nothing (and connecting to them fails).
+"""
+
+from flask.signals import Namespace
+
+
+_signals = Namespace()
+
+#: Sent by :meth:`Pushrod.render_response <flask.ext.pushrod.Pushrod.render_response>` after rendering a response while :attr:`~flask.ext.pushrod.Pushrod.memory_accounting` is enabled.
+#: The sender is the app, and the arguments are ``endpoint`` (:obj:`None` outside of a request), ``renderer`` (the name of the renderer used), ``peak`` and ``allocated`` (see :meth:`Measurement.finish <flask.ext.pushrod.memory.Measurement.finish>`).
+response_memory_measured = _signals.signal('pushrod-response-memory-measured')
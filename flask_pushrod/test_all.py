@@ -3,17 +3,53 @@ import flask
 
 from werkzeug.test import EnvironBuilder
 
+from werkzeug.exceptions import BadRequest
+
 from nose.tools import raises
+from nose.plugins.skip import SkipTest
 
 from .resolver import Pushrod, pushrod_view
-from .renderers.base import renderer, UnrenderedResponse, RendererNotFound
+from .batch import batch_view
+from .renderers import bundled_renderers
+from .renderers.base import renderer, UnrenderedResponse, RendererNotFound, LazyRenderer
 from .renderers.json import json_renderer
 from .renderers.jinja2 import jinja2_renderer
+from .renderers.csv import csv_renderer, tsv_renderer, flatten_record
+from .response import PushrodResponse
+from .cache import LRUCache
+from .lazy import LazyDict, LazyList
+from .parsers import ParserNotFound
+from .parsers.json import iter_json_array
+from .budget import BudgetExceeded
+from .registry import Registry, OverrideRegistry
+from .tracing import InMemoryTracer
+from .raw import RawJSON
+from .patch import diff, apply_patch, version_tag, snapshot
+from .signals import response_memory_measured
+from . import memory
+
+from flask.signals import signals_available
 
 from unittest import TestCase
+from StringIO import StringIO
+from functools import wraps
 import json
 
 import logging
+import subprocess
+import sys
+import tempfile
+import threading
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover
+    pandas = None
 
 
 test_response_str = """
@@ -40,6 +76,18 @@ def repr_renderer(unrendered, **kwargs):
     return unrendered.rendered(repr(unrendered.response), "text/plain")
 
 
+def skip_if(condition, reason):
+    # unittest.skipIf only exists since Python 2.7
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if condition:
+                raise SkipTest(reason)
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 def test_logging_no_app():
     pushrod = Pushrod()
     assert pushrod.logger == logging
@@ -127,6 +175,325 @@ class PushrodResolverTestCase(PushrodTestCase):
         assert test_regular_response_response.status_code == 200
         assert test_regular_response_response.data == "test"
 
+    def test_file_passthrough(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write("spam and eggs")
+            f.flush()
+
+            @self.app.route("/file")
+            @pushrod_view()
+            def test_file_view():
+                body = open(f.name, 'rb')
+                body.seek(5)
+                return body
+
+            @self.app.route("/string_io")
+            @pushrod_view()
+            def test_string_io_view():
+                return StringIO("spam"), 201, {'Content-Type': 'image/png'}
+
+            file_response = self.client.get("/file?format=json")
+            assert file_response.status_code == 200
+            assert file_response.data == "and eggs"
+            assert file_response.headers['Content-Type'] == 'application/octet-stream'
+            assert file_response.headers['Content-Length'] == '8'
+
+            string_io_response = self.client.get("/string_io")
+            assert string_io_response.status_code == 201
+            assert string_io_response.data == "spam"
+            assert string_io_response.headers['Content-Type'] == 'image/png'
+            assert string_io_response.headers['Content-Length'] == '4'
+
+    def test_buffer_passthrough(self):
+        try:
+            memoryview
+        except NameError:  # pragma: no cover
+            raise SkipTest("memoryview doesn't exist on Python 2.6")
+
+        @self.app.route("/memoryview")
+        @pushrod_view()
+        def test_memoryview_view():
+            return UnrenderedResponse(memoryview(bytearray("x" * 100000)), headers={'X-Test': 'yes'})
+
+        memoryview_response = self.client.get("/memoryview")
+        assert memoryview_response.status_code == 200
+        assert memoryview_response.data == "x" * 100000
+        assert memoryview_response.headers['Content-Length'] == '100000'
+        assert memoryview_response.headers['X-Test'] == 'yes'
+
+    def test_static_view(self):
+        calls = []
+
+        @self.app.route("/static")
+        @self.app.route("/static/<int:id>")
+        @pushrod_view(static=True)
+        def test_static_view(id=0):
+            calls.append(id)
+            return UnrenderedResponse({u'id': id}, 201, {'X-Spam': "eggs"})
+
+        for i in xrange(2):
+            response = self.client.get("/static")
+            assert response.status_code == 201
+            assert response.headers['X-Spam'] == "eggs"
+            assert response.data == repr({u'id': 0})
+        assert calls == [0]
+
+        for i in xrange(2):
+            response = self.client.get("/static?format=json")
+            assert response.mimetype == 'application/json'
+            assert json.loads(response.data) == {u'id': 0}
+        assert calls == [0, 0]
+
+        response = self.client.get("/static/5")
+        assert response.data == repr({u'id': 5})
+        assert calls == [0, 0, 5]
+
+        assert self.client.get("/static?format=none").status_code == 406
+
+    def test_static_view_threshold(self):
+        calls = []
+
+        @self.app.route("/static/<int:id>")
+        @pushrod_view(static=True, static_threshold=2)
+        def test_static_view(id):
+            calls.append(id)
+            return {u'id': id}
+
+        for id in (1, 2, 1, 3, 1, 2):
+            assert json.loads(self.client.get("/static/%i?format=json" % id).data) == {u'id': id}
+        assert calls == [1, 2, 3, 2]
+
+    def test_vary_accept(self):
+        @self.app.route("/")
+        @pushrod_view()
+        def test_vary_view():
+            return UnrenderedResponse({}, headers={'Vary': "Cookie"})
+
+        negotiated = self.client.get("/", headers=[('Accept', 'application/json')])
+        assert negotiated.headers['Vary'] == "Cookie, Accept"
+
+        explicit = self.client.get("/?format=json")
+        assert explicit.headers['Vary'] == "Cookie"
+
+        with self.app.test_request_context("/"):
+            assert 'Vary' not in self.pushrod.render_response({}, json_renderer).headers
+
+    def test_cache_control(self):
+        policy = {'public': True, 'max_age': 60, 'stale_while_revalidate': 30, 'no_transform': False}
+
+        @self.app.route("/")
+        @pushrod_view(cache_control=policy)
+        def test_cache_control_view():
+            return {}
+
+        @self.app.route("/own")
+        @pushrod_view(cache_control=policy)
+        def test_own_cache_control_view():
+            return UnrenderedResponse({}, headers={'Cache-Control': "no-store"})
+
+        @self.app.route("/missing")
+        @pushrod_view(cache_control=policy)
+        def test_missing_cache_control_view():
+            return UnrenderedResponse({}, 404)
+
+        @self.app.route("/static")
+        @pushrod_view(static=True, cache_control=policy)
+        def test_static_cache_control_view():
+            return {}
+
+        assert self.client.get("/").headers['Cache-Control'] == "max-age=60, public, stale-while-revalidate=30"
+        assert self.client.get("/own").headers['Cache-Control'] == "no-store"
+        assert 'Cache-Control' not in self.client.get("/missing").headers
+
+        for i in xrange(2):
+            response = self.client.get("/static")
+            assert response.headers['Cache-Control'] == "max-age=60, public, stale-while-revalidate=30"
+            assert response.headers['Vary'] == "Accept"
+
+    @skip_if(not signals_available, "blinker is not installed")
+    def test_memory_accounting(self):
+        @self.app.route("/")
+        @pushrod_view()
+        def test_memory_view():
+            return {'spam': ["eggs" * 100] * 100}
+
+        measurements = []
+
+        def record(sender, **kwargs):
+            measurements.append((sender, kwargs))
+
+        with response_memory_measured.connected_to(record):
+            self.client.get("/")
+            assert measurements == []
+
+            self.pushrod.memory_accounting = True
+            self.client.get("/", headers=[('Accept', 'application/json')])
+
+        assert len(measurements) == 1
+        sender, measurement = measurements[0]
+        assert sender is self.app
+        assert measurement['endpoint'] == 'test_memory_view'
+        assert measurement['renderer'] == 'json'
+        assert set(measurement) == set(['endpoint', 'renderer', 'peak', 'allocated'])
+
+    @skip_if(memory.memory_usage()[0] is None, "memory usage can't be sampled on this platform")
+    def test_memory_threshold(self):
+        warnings = []
+        handler = logging.Handler(logging.WARNING)
+        handler.emit = warnings.append
+        self.app.logger.addHandler(handler)
+
+        @self.app.route("/<int:size>")
+        @pushrod_view()
+        def test_memory_threshold_view(size):
+            return {u'spam': u'x' * size}
+
+        try:
+            self.pushrod.memory_accounting = True
+            self.pushrod.memory_threshold = 16 * 1024 * 1024
+            self.client.get("/1024?format=json")
+            assert warnings == []
+
+            # The same response exceeds the threshold every time, not only the first time it raises the process' peak
+            for i in xrange(3):
+                self.client.get("/%i?format=json" % (32 * 1024 * 1024))
+            assert len(warnings) == 3
+            assert warnings[0].args[:2] == ('test_memory_threshold_view', 'json')
+            assert all(warning.args[2] >= self.pushrod.memory_threshold for warning in warnings)
+        finally:
+            self.app.logger.removeHandler(handler)
+
+    def test_memory_measurement(self):
+        usage = [1000]
+        current_usage, memory._current_usage = memory._current_usage, lambda: usage[0]
+
+        try:
+            outer = memory.Measurement()
+            usage[0] = 5000
+            outer.sample(usage[0])
+            inner = memory.Measurement()
+            usage[0] = 1500
+            assert inner.finish() == (0, -3500)
+            assert outer.finish() == (4000, 500)
+            assert outer.finish() == (4000, 500)
+        finally:
+            memory._current_usage = current_usage
+
+    def test_budgets(self):
+        @self.app.route("/endless")
+        @pushrod_view()
+        def test_endless_view():
+            def endless():
+                while True:
+                    yield {'spam': "eggs"}
+            return {'items': endless()}
+
+        @self.app.route("/large")
+        @pushrod_view()
+        def test_large_view():
+            return {'spam': "eggs" * 1000}
+
+        self.pushrod.max_elements = 1000
+        assert self.client.get("/endless?format=json").status_code == 500
+        assert self.client.get("/large").status_code == 200
+
+        self.pushrod.max_elements = None
+        self.pushrod.max_output_bytes = 1000
+        assert self.client.get("/large").status_code == 500
+        assert self.client.get("/large?format=json").status_code == 500
+
+        self.pushrod.max_output_bytes = None
+        self.pushrod.render_timeout = 0.01
+        # Only missing the deadline is reported as a temporary failure
+        assert self.client.get("/endless?format=json").status_code == 503
+        assert self.client.get("/large").status_code == 200
+
+    def test_depth_budget(self):
+        class Wrapper(object):
+            def __init__(self, wrapped):
+                self.wrapped = wrapped
+
+            def __pushrod_normalize__(self, pushrod):
+                return pushrod.normalize([self.wrapped])
+
+        self.pushrod.max_depth = 3
+        assert self.pushrod.normalize([[[[]]]]) == [[[[]]]]
+        assert self.pushrod.normalize([Wrapper([[]])]) == [[[[]]]]
+
+        for obj in ([[[[[]]]]], [Wrapper([[[]]])], {'spam': [[{'eggs': None}]]}):
+            self.assertRaises(BudgetExceeded, self.pushrod.normalize, obj)
+
+        self.pushrod.max_depth = None
+        assert self.pushrod.normalize([[[[[]]]]]) == [[[[[]]]]]
+
+    def test_layout(self):
+        @self.app.route("/")
+        @pushrod_view()
+        def test_layout_view():
+            return {'posts': [{'id': 1}, {'id': 2}]}
+
+        @self.app.route("/columns")
+        @pushrod_view(layout='columns')
+        def test_columns_layout_view():
+            return {'posts': [{'id': 1}, {'id': 2}]}
+
+        records = {u'posts': [{u'id': 1}, {u'id': 2}]}
+        columns = {u'posts': {u'columns': [u'id'], u'rows': [[1], [2]]}}
+
+        assert json.loads(self.client.get("/?format=json").data) == records
+        assert json.loads(self.client.get("/?format=json&layout=columns").data) == columns
+        assert json.loads(self.client.get("/columns?format=json").data) == columns
+        assert json.loads(self.client.get("/columns?format=json&layout=records").data) == records
+
+        # Unknown layouts are ignored, since the argument may mean something else to the app
+        assert json.loads(self.client.get("/?format=json&layout=spam").data) == records
+        assert self.client.get("/?layout=spam").status_code == 200
+
+    def test_references_view(self):
+        shared = type('Shared', (object,), {'__pushrod_field__': 'value', 'value': {'spam': "eggs"}})()
+
+        @self.app.route("/")
+        @pushrod_view(references=True)
+        def test_references_view():
+            return {'first': shared, 'second': shared}
+
+        assert json.loads(self.client.get("/?format=json").data) == {
+            u'data': {u'first': {u'$ref': u'Shared#1'}, u'second': {u'$ref': u'Shared#1'}},
+            u'included': {u'Shared#1': {u'spam': u'eggs'}},
+        }
+
+    def test_tracing(self):
+        class Post(object):
+            __pushrod_fields__ = ('title',)
+
+            def __init__(self, title):
+                self.title = title
+
+        @self.app.route("/")
+        @pushrod_view()
+        def test_tracing_view():
+            return {'posts': [Post("spam")], 'count': 1}
+
+        tracer = self.pushrod.tracer = InMemoryTracer()
+        assert json.loads(self.client.get("/?format=json").data) == {u'posts': [{u'title': u'spam'}], u'count': 1}
+
+        view, = [span for span in tracer.spans if span.parent is None]
+        assert view.name == 'pushrod.view'
+        assert view.attributes == {'endpoint': 'test_tracing_view'}
+        assert [span.name for span in tracer.children(view)] == ['pushrod.view_function', 'pushrod.negotiate', 'pushrod.normalize', 'pushrod.render']
+
+        normalize = tracer.children(view)[2]
+        assert normalize.attributes == {'renderer': 'json'}
+        assert tracer.children(normalize) == []
+
+        tracer.clear()
+        self.pushrod.trace_model_types = True
+        assert json.loads(self.client.get("/?format=json").data) == {u'posts': [{u'title': u'spam'}], u'count': 1}
+
+        normalize, = [span for span in tracer.spans if span.name == 'pushrod.normalize']
+        assert sorted((span.attributes['key'], span.attributes['type']) for span in tracer.children(normalize)) == \
+            [('count', 'int'), ('posts', 'list of Post')]
+
     @raises(RendererNotFound)
     def test_renderer_not_found(self):
         @self.app.route("/")
@@ -186,6 +553,41 @@ class PushrodResolverTestCase(PushrodTestCase):
 
         Pushrod(self.app, default_renderer=repr_renderer)
 
+    def test_handmade_renderer_registration(self):
+        def handmade_renderer(unrendered, **kwargs):
+            return unrendered.rendered("handmade", "text/plain")
+        handmade_renderer._is_pushrod_renderer = True
+        handmade_renderer.renderer_names = ('handmade',)
+        handmade_renderer.renderer_mime_types = ('text/x-handmade',)
+
+        self.pushrod.register_renderer(handmade_renderer)
+        Pushrod(Flask(__name__), renderers=(handmade_renderer,))
+
+        with self.app.test_request_context():
+            assert self.pushrod.render_response({}, handmade_renderer).data == "handmade"
+
+    def test_lazy_renderer_registration(self):
+        script = "import sys, flask_pushrod; flask_pushrod.Pushrod(); print 'flask_pushrod.renderers.json' in sys.modules"
+        output = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE).communicate()[0]
+        assert output.strip() == 'False'
+
+        pushrod = Pushrod(renderers=['json'])
+        renderer = pushrod.named_renderers['json']
+
+        assert isinstance(renderer, LazyRenderer)
+        assert renderer.renderer_names == json_renderer.renderer_names
+        assert renderer.renderer_mime_types == json_renderer.renderer_mime_types
+        assert renderer == json_renderer
+        assert renderer.resolve() is json_renderer
+
+        for name, renderer in bundled_renderers.items():
+            assert renderer.renderer_names == renderer.resolve().renderer_names
+            assert renderer.renderer_mime_types == renderer.resolve().renderer_mime_types
+
+    @raises(LookupError)
+    def test_unknown_renderer_name(self):
+        Pushrod(renderers=['nonexistent'])
+
     @raises(TypeError)
     def test_register_invalid_renderer(self):
         def dummy():  # pragma: no cover
@@ -211,6 +613,212 @@ class PushrodResolverTestCase(PushrodTestCase):
         assert u'aaa' in response_json
         assert response_json[u'aaa'] == u"hi"
 
+    def test_batch(self):
+        calls = []
+
+        @self.app.route("/posts/<int:id>", methods=['GET', 'POST'])
+        @pushrod_view()
+        def test_post_view(id):
+            calls.append((id, flask.request.headers.get('X-Token'), flask.request.json))
+            return UnrenderedResponse({u'id': id}, 201, {'X-Id': str(id)})
+
+        @self.app.route("/plain")
+        def test_plain_view():
+            return "plain"
+
+        self.app.add_url_rule("/batch", "batch", batch_view(max_requests=4), methods=['POST'])
+
+        def batch(subrequests):
+            return self.client.post("/batch?format=json", data=json.dumps(subrequests), content_type='application/json',
+                                    headers={'X-Token': "secret"})
+
+        response = batch([
+            {'path': "/posts/1"},
+            {'path': "/posts/2", 'method': "post", 'body': {u'read': True}, 'headers': {'X-Token': "other"}},
+            {'path': "/plain"},
+            {'path': "/missing"},
+        ])
+        assert response.status_code == 200
+
+        responses = json.loads(response.data)[u'responses']
+        assert responses[0] == {u'status': 201, u'headers': {u'X-Id': u'1'}, u'body': {u'id': 1}}
+        assert responses[1][u'body'] == {u'id': 2}
+        assert responses[2][u'status'] == 200
+        assert responses[2][u'body'] == u"plain"
+        assert responses[3][u'status'] == 404
+        assert responses[3][u'body'][u'error'] == u"Not Found"
+        assert calls == [(1, "secret", None), (2, "other", {u'read': True})]
+
+        assert batch([{'path': "/posts/1"}] * 5).status_code == 400
+        assert batch({'path': "/posts/1"}).status_code == 400
+        assert batch([{'method': "GET"}]).status_code == 400
+
+        nested = batch([{'path': "/batch", 'method': "POST", 'body': [{'path': "/posts/3"}]}])
+        assert json.loads(nested.data)[u'responses'][0][u'status'] == 400
+        assert len(calls) == 2
+
+    def test_batch_request_state(self):
+        class Post(object):
+            def __pushrod_normalize__(self, pushrod):
+                # Like a normalizer that hides details in list views
+                return {u'list_view': getattr(flask.g, 'list_view', False)}
+
+        @self.app.route("/posts")
+        @pushrod_view()
+        def test_list_view():
+            flask.g.list_view = True
+            return {u'posts': [Post()]}
+
+        @self.app.route("/posts/1")
+        @pushrod_view()
+        def test_post_view():
+            return {u'post': Post()}
+
+        for threads in (None, 2):
+            self.app.add_url_rule("/batch/%s" % threads, "batch_%s" % threads, batch_view(threads=threads), methods=['POST'])
+            response = self.client.post("/batch/%s?format=json" % threads, data=json.dumps([{'path': "/posts"}, {'path': "/posts/1"}]),
+                                        content_type='application/json')
+            responses = json.loads(response.data)[u'responses']
+            assert responses[0][u'body'] == {u'posts': [{u'list_view': True}]}
+            assert responses[1][u'body'] == {u'post': {u'list_view': False}}
+
+    def test_batch_threads(self):
+        @self.app.route("/posts/<int:id>")
+        @pushrod_view()
+        def test_post_view(id):
+            return {u'id': id, u'thread': threading.current_thread().name}
+
+        self.app.add_url_rule("/batch", "batch", batch_view(threads=2), methods=['POST'])
+
+        response = self.client.post("/batch?format=json", data=json.dumps([{'path': "/posts/%i" % i} for i in xrange(6)]),
+                                    content_type='application/json')
+        responses = json.loads(response.data)[u'responses']
+
+        assert [item[u'body'][u'id'] for item in responses] == range(6)
+        assert threading.current_thread().name not in [item[u'body'][u'thread'] for item in responses]
+
+    def test_native(self):
+        self.pushrod.normalizer_overrides[unicode].append(lambda x, pushrod: x.upper())
+
+        @self.app.route("/native")
+        @pushrod_view(native=True)
+        def test_native_view():
+            return {u'spam': [u'eggs', 1, None, RawJSON('{}')]}
+
+        @self.app.route("/native_response")
+        @pushrod_view()
+        def test_native_response_view():
+            return UnrenderedResponse({u'spam': u'eggs'}, native=True)
+
+        @self.app.route("/normalized")
+        @pushrod_view()
+        def test_normalized_view():
+            return {u'spam': u'eggs'}
+
+        assert json.loads(self.client.get("/native?format=json").data) == {u'spam': [u'eggs', 1, None, {}]}
+        assert json.loads(self.client.get("/native_response?format=json").data) == {u'spam': u'eggs'}
+        assert json.loads(self.client.get("/normalized?format=json").data) == {u'SPAM': u'EGGS'}
+
+        self.app.debug = True
+        assert self.client.get("/native?format=json").status_code == 200
+
+    @raises(TypeError)
+    def test_native_validation(self):
+        self.app.debug = True
+
+        @self.app.route("/native")
+        @pushrod_view(native=True)
+        def test_native_view():
+            return {u'spam': [u'eggs', (1, 2)]}
+
+        self.client.get("/native?format=json")
+
+    @raises(ValueError)
+    def test_static_deltas(self):
+        pushrod_view(static=True, deltas=True)
+
+    def test_deltas(self):
+        document = {u'title': u"Spam", u'tags': [u'a', u'b'], u'author': {u'name': u"Monty"}}
+
+        @self.app.route("/document")
+        @pushrod_view(deltas=True)
+        def test_document_view():
+            return dict(document)
+
+        first = self.client.get("/document", headers={'Accept': 'application/json'})
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+
+        not_modified = self.client.get("/document", headers={'Accept': 'application/json', 'If-None-Match': etag})
+        assert not_modified.status_code == 304
+
+        document[u'title'] = u"Eggs"
+        document[u'tags'] = [u'a']
+        document[u'views'] = 5
+
+        patched = self.client.get("/document", headers={'Accept': 'application/json-patch+json, application/json', 'If-None-Match': etag})
+        assert patched.status_code == 200
+        assert patched.mimetype == 'application/json-patch+json'
+        assert patched.headers['ETag'] != etag
+        assert 'Accept' in patched.headers['Vary']
+        assert apply_patch(json.loads(first.data), json.loads(patched.data)) == document
+
+        unpatched = self.client.get("/document", headers={'Accept': 'application/json', 'If-None-Match': etag})
+        assert unpatched.mimetype == 'application/json'
+        assert json.loads(unpatched.data) == document
+        assert unpatched.headers['ETag'] == patched.headers['ETag']
+
+        unknown = self.client.get("/document", headers={'Accept': 'application/json-patch+json, application/json', 'If-None-Match': '"unknown"'})
+        assert unknown.mimetype == 'application/json'
+
+    def test_delta_variants(self):
+        @self.app.route("/document")
+        @pushrod_view(deltas=True)
+        def test_document_view():
+            return {u'title': u"Spam"}
+
+        @renderer('declining', 'text/x-declining')
+        def declining_renderer(unrendered, **kwargs):
+            return NotImplemented
+        self.pushrod.register_renderer(declining_renderer)
+
+        json_response = self.client.get("/document", headers={'Accept': 'application/json'})
+        repr_response = self.client.get("/document?format=repr")
+        assert json_response.headers['ETag'] != repr_response.headers['ETag']
+
+        # The JSON version isn't the version that another renderer would send
+        other = self.client.get("/document?format=repr", headers={'If-None-Match': json_response.headers['ETag']})
+        assert other.status_code == 200
+        assert other.data == repr_response.data
+
+        same = self.client.get("/document?format=repr", headers={'If-None-Match': repr_response.headers['ETag']})
+        assert same.status_code == 304
+
+        # Also when the version is only known after falling back from another renderer (to the default renderer)
+        fallback = self.client.get("/document", headers={'Accept': 'text/x-declining', 'If-None-Match': repr_response.headers['ETag']})
+        assert fallback.status_code == 304
+        fallback = self.client.get("/document", headers={'Accept': 'text/x-declining', 'If-None-Match': json_response.headers['ETag']})
+        assert fallback.status_code == 200
+
+    def test_native_deltas(self):
+        document = {u'title': u"Spam", u'tags': [u'a', u'b']}
+
+        @self.app.route("/document")
+        @pushrod_view(deltas=True, native=True)
+        def test_document_view():
+            return document
+
+        first = self.client.get("/document", headers={'Accept': 'application/json'})
+        etag = first.headers['ETag']
+
+        document[u'title'] = u"Eggs"
+        document[u'tags'].append(u'c')
+
+        patched = self.client.get("/document", headers={'Accept': 'application/json-patch+json, application/json', 'If-None-Match': etag})
+        assert patched.mimetype == 'application/json-patch+json'
+        assert json.loads(patched.data)
+        assert apply_patch(json.loads(first.data), json.loads(patched.data)) == document
+
 
 class PushrodNormalizerTestCase(PushrodTestCase):
     def test_basestring_normalizer(self):
@@ -301,6 +909,362 @@ class PushrodNormalizerTestCase(PushrodTestCase):
         assert self.pushrod.normalize(1) == u"1"
 
 
+    def test_deep_normalizer(self):
+        class Node(object):
+            __pushrod_fields__ = ["child"]
+
+            def __init__(self, child):
+                self.child = child
+
+        deep = []
+        for i in xrange(5000):
+            deep = {5: Node([deep, i])}
+
+        normalized = self.pushrod.normalize(deep)
+
+        # Comparing the whole structure at once would hit the recursion limit
+        for i in reversed(xrange(5000)):
+            assert normalized.keys() == [u'5']
+            assert normalized[u'5'].keys() == [u'child']
+            normalized, value = normalized[u'5'][u'child']
+            assert value == i
+
+        assert normalized == []
+
+    def test_cycles(self):
+        class Node(object):
+            __pushrod_fields__ = ['other']
+
+        class Alias(object):
+            __pushrod_field__ = 'other'
+
+        node, alias = Node(), Alias()
+        node.other = node
+        alias.other = alias
+
+        looped_dict = {}
+        looped_dict[u'self'] = looped_dict
+        looped_list = [1]
+        looped_list.append([looped_list])
+
+        for value in (node, alias, looped_dict, looped_list):
+            for references in (False, True):
+                if isinstance(value, Node) and references:
+                    # Objects become references instead
+                    continue
+                try:
+                    self.pushrod.normalize(value, references=references)
+                except ValueError:
+                    pass
+                else:
+                    assert False, value
+
+        # Repeating a value is fine, as long as it doesn't contain itself
+        shared = {u'spam': [u'eggs']}
+        assert self.pushrod.normalize([shared, {u'nested': shared}, shared]) == [shared, {u'nested': shared}, shared]
+
+    def test_empty_container_normalizer(self):
+        assert self.pushrod.normalize({'a': [], 'b': {}, 'c': ((),)}) == {u'a': [], u'b': {}, u'c': [[]]}
+
+    def test_key_normalizer_override(self):
+        self.pushrod.normalizer_overrides[unicode].append(lambda x, pushrod: x.upper())
+
+        assert self.pushrod.normalize({'a': u'b'}) == {u'A': u'B'}
+
+    def test_columns_layout(self):
+        records = [{'id': 1, 'name': "spam"}, {'id': 2, 'name': "eggs", 'extra': None}]
+
+        assert self.pushrod.normalize(records, layout='columns') == records
+        assert self.pushrod.normalize({'records': records[:1] * 2, 'ids': [{'id': 1}], 'empty': []}, layout='columns') == {
+            u'records': {u'columns': [u'id', u'name'], u'rows': [[1, u'spam'], [1, u'spam']]},
+            u'ids': {u'columns': [u'id'], u'rows': [[1]]},
+            u'empty': [],
+        }
+        assert self.pushrod.normalize(records[:1]) == [{u'id': 1, u'name': u'spam'}]
+
+    def test_references(self):
+        class Author(object):
+            __pushrod_fields__ = ('name',)
+
+            def __init__(self, name, id=None):
+                self.name = name
+                if id is not None:
+                    self.__pushrod_key__ = id
+
+        class Post(object):
+            __pushrod_fields__ = ('title', 'author')
+
+            def __init__(self, title, author):
+                self.title = title
+                self.author = author
+
+        monty = Author("Monty")
+        posts = [Post("Spam", monty), Post("Eggs", monty), Post("Ham", Author("Graham"))]
+
+        assert self.pushrod.normalize(posts, references=True) == {
+            u'data': [
+                {u'title': u'Spam', u'author': {u'$ref': u'Author#1'}},
+                {u'title': u'Eggs', u'author': {u'$ref': u'Author#1'}},
+                {u'title': u'Ham', u'author': {u'name': u'Graham'}},
+            ],
+            u'included': {
+                u'Author#1': {u'name': u'Monty'},
+            },
+        }
+        assert self.pushrod.normalize(posts)[1] == {u'title': u'Eggs', u'author': {u'name': u'Monty'}}
+
+        # Separate instances with the same declared key
+        posts = [Post("Spam", Author("Monty", 5)), Post("Eggs", Author("Monty", 5))]
+        assert self.pushrod.normalize(posts, references=True)[u'included'] == {u'Author:5': {u'name': u'Monty'}}
+
+        # Declared keys and numbered instances don't share names, even if the key is a number
+        keyed, unkeyed = Author("Keyed", 1), Author("Unkeyed")
+        normalized = self.pushrod.normalize([keyed, keyed, unkeyed, unkeyed], references=True)
+        assert normalized[u'data'] == [{u'$ref': u'Author:1'}, {u'$ref': u'Author:1'}, {u'$ref': u'Author#1'}, {u'$ref': u'Author#1'}]
+        assert normalized[u'included'] == {u'Author:1': {u'name': u'Keyed'}, u'Author#1': {u'name': u'Unkeyed'}}
+
+        # Neither do classes with the same name
+        other = type('Author', (object,), {'__pushrod_fields__': ('name',), '__pushrod_key__': 1, 'name': u"Other"})()
+        normalized = self.pushrod.normalize([keyed, keyed, other, other], references=True)
+        assert len(normalized[u'included']) == 2
+        assert normalized[u'included'][u'Author:1'] == {u'name': u'Keyed'}
+
+    def test_references_cycle(self):
+        class Node(object):
+            __pushrod_fields__ = ('name', 'other')
+
+            def __init__(self, name):
+                self.name = name
+                self.other = None
+
+        first, second = Node("first"), Node("second")
+        first.other, second.other = second, first
+
+        assert self.pushrod.normalize(first, references=True) == {
+            u'data': {u'name': u'first', u'other': {u'name': u'second', u'other': {u'$ref': u'Node#1'}}},
+            u'included': {u'Node#1': {u'name': u'first', u'other': {u'name': u'second', u'other': {u'$ref': u'Node#1'}}}},
+        }
+
+    def test_registry_changes(self):
+        class MyClass(object):
+            pass
+
+        assert self.pushrod.normalize(MyClass()) is NotImplemented
+
+        self.pushrod.normalizers[object] = lambda x, pushrod: u'object'
+        assert self.pushrod.normalize(MyClass()) == u'object'
+
+        self.pushrod.normalizer_overrides[MyClass].append(lambda x, pushrod: u'override')
+        assert self.pushrod.normalize(MyClass()) == u'override'
+
+        del self.pushrod.normalizer_overrides[MyClass][0]
+        assert self.pushrod.normalize(MyClass()) == u'object'
+        assert MyClass not in self.pushrod.normalizer_overrides
+
+    def test_registry_snapshots(self):
+        registry = Registry({'a': 1})
+        snapshot, version = registry.snapshot, registry.version
+
+        registry.update(b=2, c=3)
+        assert snapshot == {'a': 1}
+        assert registry == {'a': 1, 'b': 2, 'c': 3}
+        assert registry.version != version
+
+        overrides = OverrideRegistry()
+        assert overrides[int] == []
+        assert int not in overrides
+
+        overrides[int].append(str)
+        overrides[int].insert(0, repr)
+        assert overrides[int] == [repr, str]
+        assert overrides.get(int) == (repr, str)
+
+
+    @skip_if(numpy is None, "NumPy is not installed")
+    def test_numpy_normalizer(self):
+        normalized = self.pushrod.normalize({
+            'ints': numpy.arange(3),
+            'matrix': numpy.ones((2, 2), dtype=numpy.float32),
+            'strings': numpy.array(['a', 'b']),
+            'dates': numpy.array(['2012-10-03'], dtype='datetime64[ns]'),
+            'scalar': numpy.int64(5),
+        })
+
+        assert normalized == {
+            u'ints': [0, 1, 2],
+            u'matrix': [[1.0, 1.0], [1.0, 1.0]],
+            u'strings': [u'a', u'b'],
+            u'dates': [u'2012-10-03 00:00:00'],
+            u'scalar': 5,
+        }
+        assert type(normalized[u'ints'][0]) in (int, long)
+        assert type(normalized[u'scalar']) in (int, long)
+        assert type(normalized[u'strings'][0]) is unicode
+
+        rendered = self.pushrod.render_response({'ints': numpy.arange(3)}, json_renderer)
+        assert json.loads(rendered.data) == {u'ints': [0, 1, 2]}
+
+    @skip_if(pandas is None, "pandas is not installed")
+    def test_pandas_normalizer(self):
+        frame = pandas.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+
+        assert pandas.DataFrame not in self.pushrod.normalizers
+
+        assert self.pushrod.normalize(frame) == [{u'a': 1, u'b': u'x'}, {u'a': 2, u'b': u'y'}]
+        assert self.pushrod.normalize(frame['a']) == [1, 2]
+
+        self.pushrod.dataframe_layout = 'columns'
+        assert self.pushrod.normalize(frame) == {u'a': [1, 2], u'b': [u'x', u'y']}
+
+
+    def test_lazy_normalizer(self):
+        calls = []
+
+        class MyClass(object):
+            def __init__(self, value):
+                self.value = value
+
+            def __pushrod_normalize__(self, pushrod):
+                calls.append(self.value)
+                return self.value
+
+        normalized = self.pushrod.normalize({
+            'one': MyClass(1),
+            'many': (MyClass(2), MyClass(3)),
+            'none': object(),
+        }, lazy=True)
+
+        assert isinstance(normalized, LazyDict)
+        assert calls == []
+
+        assert normalized[u'one'] == 1
+        assert calls == [1]
+
+        assert isinstance(normalized[u'many'], LazyList)
+        assert normalized[u'many'][1] == 3
+        assert calls == [1, 3]
+
+        assert normalized[u'one'] == 1
+        assert calls == [1, 3]
+
+        assert u'none' not in normalized
+        assert normalized == {u'one': 1, u'many': [2, 3]}
+        assert sorted(calls) == [1, 2, 3]
+
+    def test_lazy_normalizer_fields(self):
+        class MyClass(object):
+            __pushrod_fields__ = ["one", "children"]
+
+            def __init__(self, one, children=()):
+                self.one = one
+                self.children = children
+
+        normalized = self.pushrod.normalize([MyClass(u'first', [MyClass(u'second')])], lazy=True)
+
+        assert isinstance(normalized, LazyList)
+        assert isinstance(normalized[0], LazyDict)
+        assert isinstance(normalized[0][u'children'], LazyList)
+        assert normalized == self.pushrod.normalize([MyClass(u'first', [MyClass(u'second')])])
+
+    def test_lazy_normalizer_override(self):
+        self.pushrod.normalizer_overrides[dict].append(lambda x, pushrod: len(x))
+
+        assert self.pushrod.normalize({'a': 1}, lazy=True) == 1
+
+    def test_lazy_renderer(self):
+        @renderer('lazy', normalize='lazy')
+        def lazy_renderer(unrendered, **kwargs):
+            return unrendered.rendered(unicode(unrendered.response[u'spam']), 'text/plain')
+
+        rendered = self.pushrod.render_response(test_response, lazy_renderer)
+
+        assert rendered.data == "eggs"
+
+
+    def test_schema(self):
+        class Author(object):
+            __pushrod_fields__ = ["name"]
+
+            def __init__(self, name):
+                self.name = name
+
+        class Post(object):
+            def __init__(self, id, title, author, extra):
+                self.id = id
+                self.title = title
+                self.author = author
+                self.extra = extra
+
+        schema = self.pushrod.schema(Post, {
+            'id': int,
+            'title': unicode,
+            'author': None,
+            'extra': None,
+        })
+
+        assert schema.normalizer is None
+        self.pushrod.compile_schemas()
+        assert schema.normalizer is not None
+        assert 'x.title' in schema.normalizer.source
+
+        assert self.pushrod.normalize(Post('5', 'Hello', Author('Spam'), object())) == {
+            u'id': 5,
+            u'title': u'Hello',
+            u'author': {u'name': u'Spam'},
+        }
+
+        assert self.pushrod.normalize(Post(None, None, None, None)) == {
+            u'id': None,
+            u'title': None,
+            u'author': None,
+            u'extra': None,
+        }
+
+    def test_schema_override(self):
+        class MyClass(object):
+            __pushrod_fields__ = ["one", "two"]
+
+            def __init__(self):
+                self.one = 1
+                self.two = 2
+
+        self.pushrod.schema(MyClass, ['one'])
+        assert self.pushrod.normalize(MyClass()) == {u'one': 1, u'two': 2}
+
+        self.pushrod.schema(MyClass, {'two': lambda x, pushrod: x * 2}, override=True)
+        assert self.pushrod.normalize(MyClass()) == {u'two': 4}
+
+    def test_schema_keyword_fields(self):
+        class MyClass(object):
+            pass
+
+        x = MyClass()
+        setattr(x, 'from', u'spam')
+        setattr(x, 'class', 1)
+
+        self.pushrod.schema(MyClass, ['from', 'class'])
+        assert self.pushrod.normalize(x) == {u'from': u'spam', u'class': 1}
+
+    @raises(TypeError)
+    def test_schema_invalid_conversion(self):
+        self.pushrod.schema(object, {'one': 5}).compile()
+
+    def test_raw_json_normalizer(self):
+        class Cached(object):
+            __pushrod_raw_json__ = '{"cached": true}'
+
+        raw = RawJSON('{"spam": ["eggs"]}')
+        normalized = self.pushrod.normalize({'raw': raw, 'cached': Cached()})
+
+        assert normalized[u'raw'] is raw
+        assert isinstance(normalized[u'cached'], RawJSON)
+        assert normalized[u'cached'].json == '{"cached": true}'
+
+        assert raw[u'spam'] == [u'eggs']
+        assert raw == {u'spam': [u'eggs']}
+        assert self.pushrod.normalize(raw, lazy=True) is raw
+
+
 class PushrodRendererTestCase(PushrodTestCase):
     def test_json_renderer(self):
         regular = json.dumps(test_response)
@@ -311,6 +1275,96 @@ class PushrodRendererTestCase(PushrodTestCase):
 
         json.loads(rendered.data)
 
+    def test_json_renderer_raw_json(self):
+        response = {
+            'raw': RawJSON('{"spam":  "eggs"}'),
+            'list': [RawJSON(u'[1, "\u00e5"]'), RawJSON('null')],
+            'string': '__pushrod_raw_0_1__',
+        }
+        rendered = self.pushrod.render_response(response, json_renderer)
+
+        assert '{"spam":  "eggs"}' in rendered.data
+        assert json.loads(rendered.data) == {
+            u'raw': {u'spam': u'eggs'},
+            u'list': [[1, u'\u00e5'], None],
+            u'string': u'__pushrod_raw_0_1__',
+        }
+
+        assert self.pushrod.render_response(RawJSON('[1, 2]'), json_renderer).data == '[1, 2]'
+
+    def test_csv_renderer(self):
+        self.pushrod.register_renderer(csv_renderer)
+        self.pushrod.register_renderer(tsv_renderer)
+        consumed = []
+
+        @self.app.route("/")
+        @pushrod_view(csv_chunk_size=2)
+        def test_csv_view():
+            def records():
+                for i in xrange(5):
+                    consumed.append(i)
+                    yield {'id': i, 'name': u"\u00e5, %i" % i, 'author': {'name': "Monty"}, 'tags': ["a"], 'deleted': None}
+            return records()
+
+        @self.app.route("/dict")
+        @pushrod_view(csv_columns=['id', 'missing'], csv_records_key='posts')
+        def test_csv_dict_view():
+            return {'posts': [{'id': 1, 'ignored': True}]}
+
+        response = self.client.get("/?format=csv")
+        assert response.mimetype == 'text/csv'
+        assert consumed == []
+        assert response.data.splitlines() == [
+            'author.name,deleted,id,name,tags',
+            'Monty,,0,"\xc3\xa5, 0","[""a""]"',
+            'Monty,,1,"\xc3\xa5, 1","[""a""]"',
+            'Monty,,2,"\xc3\xa5, 2","[""a""]"',
+            'Monty,,3,"\xc3\xa5, 3","[""a""]"',
+            'Monty,,4,"\xc3\xa5, 4","[""a""]"',
+        ]
+        assert consumed == range(5)
+
+        response = self.client.get("/dict", headers=[('Accept', 'text/tab-separated-values')])
+        assert response.mimetype == 'text/tab-separated-values'
+        assert response.data.splitlines() == ['id\tmissing', '1\t']
+
+        # Without a records key, dicts are left to the next renderer
+        assert csv_renderer(UnrenderedResponse({'posts': []})) is NotImplemented
+
+        assert flatten_record({'a': {'b': {'c': 1}}, 'd': 2}) == {'a.b.c': 1, 'd': 2}
+
+    def test_csv_renderer_raw_json(self):
+        self.pushrod.register_renderer(csv_renderer)
+
+        @self.app.route("/")
+        @pushrod_view()
+        def test_csv_view():
+            return [{'raw': RawJSON('{"a": 1}'), 'list': [RawJSON('[1]'), 2]}]
+
+        response = self.client.get("/?format=csv")
+        assert response.data.splitlines() == ['list,raw', '"[[1], 2]","{""a"": 1}"']
+
+    def test_csv_renderer_budget(self):
+        self.pushrod.register_renderer(csv_renderer)
+        self.pushrod.max_elements = 20
+        self.pushrod.max_depth = 3
+
+        @self.app.route("/many")
+        @pushrod_view()
+        def test_many_view():
+            return ({'id': i} for i in xrange(100))
+
+        @self.app.route("/deep")
+        @pushrod_view()
+        def test_deep_view():
+            return [{'a': {'b': {'c': {'d': 1}}}}]
+
+        self.assertRaises(BudgetExceeded, lambda: self.client.get("/many?format=csv").data)
+        self.assertRaises(BudgetExceeded, lambda: self.client.get("/deep?format=csv").data)
+
+        self.pushrod.max_elements = None
+        assert len(self.client.get("/many?format=csv").data.splitlines()) == 101
+
     @raises(RendererNotFound)
     def test_jinja_renderer_no_template(self):
         self.pushrod.render_response(
@@ -332,3 +1386,274 @@ class PushrodRendererTestCase(PushrodTestCase):
             "'%s' does not equal '%s'" % (rendered.data, regular)
 
         assert eval(rendered.data) == test_response
+
+    def test_jinja_renderer_template_cache(self):
+        with self.app.test_request_context():
+            self.pushrod.render_response(
+                test_response, jinja2_renderer, {'jinja_template': 'jinja.txt'})
+
+            key = (self.app.jinja_env, 'jinja.txt')
+            template = self.pushrod.template_cache.get(key)
+            assert template is not None
+
+            self.pushrod.render_response(
+                test_response, jinja2_renderer, {'jinja_template': 'jinja.txt'})
+
+            assert self.pushrod.template_cache.get(key) is template
+
+    def test_jinja_renderer_template_cache_debug(self):
+        self.app.debug = True
+
+        with self.app.test_request_context():
+            self.pushrod.render_response(
+                test_response, jinja2_renderer, {'jinja_template': 'jinja.txt'})
+
+        assert self.pushrod.template_cache.get((self.app.jinja_env, 'jinja.txt')) is None
+
+    def test_jinja_renderer_stream(self):
+        with self.app.test_request_context():
+            rendered = self.pushrod.render_response(
+                test_response, jinja2_renderer, {'jinja_template': 'jinja.txt', 'jinja_stream': True, 'jinja_buffer_size': 2})
+
+            assert rendered.is_streamed
+
+            rendered_templates = []
+            with flask.template_rendered.connected_to(lambda app, template, context: rendered_templates.append(template), self.app):
+                chunks = iter(rendered.response)
+                first = next(chunks)
+                assert rendered_templates == []
+                chunks = [first] + list(chunks)
+            assert len(rendered_templates) == 1
+
+        assert len(chunks) > 1
+        assert ''.join(chunks) == test_response_str
+
+    def test_jinja_renderer_fragment_cache(self):
+        with self.app.test_request_context():
+            first = self.pushrod.render_response(
+                {'spam': u'eggs'}, jinja2_renderer, {'jinja_template': 'fragment.txt'})
+            second = self.pushrod.render_response(
+                {'spam': u'ham'}, jinja2_renderer, {'jinja_template': 'fragment.txt'})
+
+        assert first.data == second.data == "eggs"
+        assert self.pushrod.fragment_cache.get(u'pushrod-fragment:spam') == u'eggs'
+
+    def test_shared_normalization(self):
+        normalized = []
+        self.pushrod.normalizer_overrides[unicode].append(lambda x, pushrod: normalized.append(x) or NotImplemented)
+
+        seen = []
+
+        @renderer('declining', 'application/x-declining')
+        def declining_renderer(unrendered, **kwargs):
+            seen.append(unrendered.response)
+            return NotImplemented
+
+        @renderer('declining-lazy', 'application/x-declining-lazy', normalize='lazy')
+        def declining_lazy_renderer(unrendered, **kwargs):
+            seen.append(unrendered.response)
+            return NotImplemented
+
+        class Author(object):
+            __pushrod_fields__ = ('name',)
+            name = u'Monty'
+
+        author = Author()
+        response = UnrenderedResponse({u'posts': [{u'author': author}, {u'author': author}]})
+
+        with self.app.test_request_context():
+            rendered = self.pushrod.render_response(
+                response, [declining_renderer, declining_lazy_renderer, json_renderer], references=True)
+
+        # The eager form is only normalized once, and handed unchanged to the JSON renderer
+        assert normalized.count(u'Monty') == 1
+        assert seen[0] == json.loads(rendered.data)
+        assert seen[0][u'included'] == {u'Author#1': {u'name': u'Monty'}}
+        assert isinstance(seen[1], LazyDict)
+        assert response.response[u'posts'][0][u'author'] is author
+
+    def test_pushrod_response(self):
+        cases = [
+            (u'{"sp\xe4m": 1}', None, None, 'application/json'),
+            ('eggs', 404, {'X-Spam': 'eggs'}, 'text/plain'),
+            ('eggs', 799, [('Content-Type', 'text/html')], 'text/csv'),
+            (['a', 'b'], 201, None, 'text/plain'),
+        ]
+
+        for body, status, headers, mime_type in cases:
+            fast = PushrodResponse(body, status, headers, mime_type)
+            expected = Response(body, status, headers, mime_type)
+
+            assert isinstance(fast, Response)
+            assert fast.status == expected.status
+            assert fast.status_code == expected.status_code
+            assert sorted(fast.headers.to_list()) == sorted(expected.headers.to_list())
+            assert fast.data == expected.data
+
+        with self.app.test_request_context():
+            rendered = self.pushrod.render_response({u'spam': u'eggs'}, json_renderer)
+        assert isinstance(rendered, PushrodResponse)
+        assert rendered.headers['Content-Length'] == str(len(rendered.data))
+
+    def test_pushrod_response_without_content_length(self):
+        class UnmeasuredResponse(PushrodResponse):
+            automatically_set_content_length = False
+
+        response = UnmeasuredResponse('eggs', 200, None, 'text/plain')
+        assert 'Content-Length' not in response.headers
+        assert response.data == 'eggs'
+
+
+class PushrodCacheTestCase(TestCase):
+    def test_lru_eviction(self):
+        cache = LRUCache(threshold=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_expiry(self):
+        cache = LRUCache(default_timeout=-1)
+        cache.set('a', 1)
+        cache.set('b', 2, timeout=0)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+
+    def test_add(self):
+        cache = LRUCache()
+        assert cache.add('a', 1) is True
+        assert cache.add('a', 2) is False
+        assert cache.get('a') == 1
+
+        cache.set('b', 1, timeout=-1)
+        assert cache.add('b', 2) is True
+        assert cache.get('b') == 2
+
+    def test_delete(self):
+        cache = LRUCache()
+        cache.set('a', 1)
+        assert cache.has('a')
+        assert cache.delete('a') is True
+        assert cache.delete('a') is False
+        assert not cache.has('a')
+
+    def test_independent_of_werkzeug_contrib(self):
+        # werkzeug.contrib was removed in Werkzeug 1.0
+        assert not any(cls.__module__.startswith('werkzeug') for cls in LRUCache.__mro__)
+
+
+class PushrodPatchTestCase(TestCase):
+    def test_diff(self):
+        old = {u'a/b': 1, u'list': [1, 2, 3], u'nested': {u'x': True, u'y': None}, u'gone': u"yes"}
+        new = {u'a/b': 2, u'list': [1, 5], u'nested': {u'x': 1, u'z': [1]}, u'new': {u'~': u"tilde"}}
+
+        operations = diff(old, new)
+        assert {u'op': u'replace', u'path': u'/a~1b', u'value': 2} in operations
+        assert {u'op': u'replace', u'path': u'/nested/x', u'value': 1} in operations
+        assert {u'op': u'remove', u'path': u'/gone'} in operations
+        assert apply_patch(json.loads(json.dumps(old)), operations) == new
+
+        assert diff(old, old) == []
+        assert diff([1, 2, 3, 4], [1]) == [{u'op': u'remove', u'path': u'/3'}, {u'op': u'remove', u'path': u'/2'}, {u'op': u'remove', u'path': u'/1'}]
+        assert apply_patch([1, 2], diff([1, 2], {u'a': 1})) == {u'a': 1}
+
+    def test_version_tag(self):
+        assert version_tag({u'a': 1, u'b': [1, 2]}) == version_tag({u'b': [1, 2], u'a': 1})
+        assert version_tag({u'a': 1}) != version_tag({u'a': 2})
+        assert version_tag({u'a': RawJSON('[1]')}) != version_tag({u'a': RawJSON('[2]')})
+        assert version_tag({u'a': 1}, u'json') != version_tag({u'a': 1}, u'html')
+        assert version_tag({u'a': 1}, u'json') == version_tag({u'a': 1}, u'json', snapshot({u'a': 1}))
+
+
+class PushrodParserTestCase(PushrodTestCase):
+    def test_json_parser(self):
+        with self.app.test_request_context("/", method="POST", data='{"spam": ["eggs"]}', content_type="application/json"):
+            assert self.pushrod.parse_request() == {u'spam': [u'eggs']}
+
+    def test_json_parser_stream(self):
+        body = '[1, "two", {"three": [3, 4]}, 56789, null, true]'
+
+        for chunk_size in (1, 3, 1000):
+            items = list(iter_json_array(StringIO(body), chunk_size=chunk_size))
+            assert items == [1, u'two', {u'three': [3, 4]}, 56789, None, True], items
+
+        assert list(iter_json_array(StringIO(' [ ] '), chunk_size=1)) == []
+        tricky = '[" ]}\\" \\\\", {"a": ["[", "{"]}, [[], {}], -1.5e3 ,""]'
+        for chunk_size in (1, 2, 7):
+            assert list(iter_json_array(StringIO(tricky), chunk_size=chunk_size)) == json.loads(tricky)
+        assert list(iter_json_array(StringIO('{"a": 1}'), chunk_size=1)) == [{u'a': 1}]
+
+        with self.app.test_request_context("/", method="POST", data=body, content_type="application/json"):
+            records = self.pushrod.parse_request(stream=True)
+            assert next(records) == 1
+            assert list(records) == [u'two', {u'three': [3, 4]}, 56789, None, True]
+
+    @raises(BadRequest)
+    def test_json_parser_stream_invalid(self):
+        with self.app.test_request_context("/", method="POST", data='[1, 2', content_type="application/json"):
+            list(self.pushrod.parse_request(stream=True))
+
+    def test_json_parser_stream_invalid_early(self):
+        body = StringIO('[1, {"a": x}, ' + '2, ' * 10000 + '3]')
+        items = iter_json_array(body, chunk_size=16)
+
+        assert next(items) == 1
+        try:
+            next(items)
+        except ValueError:
+            pass
+        else:  # pragma: no cover
+            assert False, "The invalid item was accepted"
+        assert body.tell() <= 32
+
+    @raises(BadRequest)
+    def test_json_parser_invalid(self):
+        with self.app.test_request_context("/", method="POST", data='{', content_type="application/json"):
+            self.pushrod.parse_request()
+
+    def test_unknown_charset(self):
+        for stream in (False, True):
+            with self.app.test_request_context("/", method="POST", data='[1]', content_type="application/json; charset=bogus"):
+                try:
+                    list(self.pushrod.parse_request(stream=stream))
+                except BadRequest:
+                    pass
+                else:  # pragma: no cover
+                    assert False, "The unknown charset was accepted"
+
+    def test_ndjson_parser(self):
+        body = '{"a": 1}\n\n{"b": 2}\n'
+
+        with self.app.test_request_context("/", method="POST", data=body, content_type="application/x-ndjson"):
+            assert self.pushrod.parse_request() == [{u'a': 1}, {u'b': 2}]
+
+        with self.app.test_request_context("/", method="POST", data=body, content_type="application/x-ndjson"):
+            records = self.pushrod.parse_request(stream=True)
+            assert next(records) == {u'a': 1}
+            assert list(records) == [{u'b': 2}]
+
+    def test_form_parser(self):
+        with self.app.test_request_context("/", method="POST", data={'spam': 'eggs'}):
+            assert self.pushrod.parse_request()['spam'] == u'eggs'
+
+        with self.app.test_request_context("/", method="POST", data={'spam': 'eggs'}):
+            assert list(self.pushrod.parse_request(stream=True)) == [('spam', u'eggs')]
+
+    @raises(ParserNotFound)
+    def test_parser_not_found(self):
+        with self.app.test_request_context("/", method="POST", data='spam', content_type="text/plain"):
+            self.pushrod.parse_request()
+
+    @raises(TypeError)
+    def test_register_invalid_parser(self):
+        def dummy():  # pragma: no cover
+            pass
+
+        self.pushrod.register_parser(dummy)
@@ -0,0 +1,126 @@
+"""
+Tracing hooks, which split a :func:`~flask.ext.pushrod.pushrod_view` request into spans for the view function, content negotiation, normalization and rendering (see :attr:`Pushrod.tracer <flask.ext.pushrod.Pushrod.tracer>`).
+
+The spans are named:
+
+- ``pushrod.view``: The whole request, with the ``endpoint`` attribute
+- ``pushrod.view_function``: Calling the view function itself
+- ``pushrod.negotiate``: Picking the renderers
+- ``pushrod.normalize``: Normalizing the response, with the ``renderer`` attribute
+- ``pushrod.normalize_model``: Normalizing a single top-level value of the response, with the ``key`` and ``type`` attributes (only if :attr:`Pushrod.trace_model_types <flask.ext.pushrod.Pushrod.trace_model_types>` is enabled)
+- ``pushrod.render``: Rendering (encoding) the normalized response, with the ``renderer`` attribute
+
+A tracer only has to implement :meth:`Tracer.span`, so adapting a tracing library is usually short. For example, for OpenTelemetry::
+
+    class OpenTelemetryTracer(Tracer):
+        def __init__(self, tracer):
+            self.tracer = tracer
+
+        def span(self, name, attributes):
+            return self.tracer.start_as_current_span(name, attributes=attributes)
+"""
+
+from contextlib import contextmanager
+
+import sys
+import threading
+import time
+
+
+class Tracer(object):
+    """
+    The interface that tracers must implement.
+    """
+
+    def span(self, name, attributes):
+        """
+        Starts a span, which should be a child of the currently active span (if any).
+
+        :param name: The name of the span
+        :param attributes: A :obj:`dict` of attributes to attach to the span
+        :returns: A context manager, which ends the span when exited
+        """
+
+        raise NotImplementedError()
+
+
+class _NoSpan(object):
+    # The context manager used while tracing is disabled
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+no_span = _NoSpan()
+
+
+class Span(object):
+    """
+    A finished span, as recorded by :class:`InMemoryTracer`.
+    """
+
+    def __init__(self, name, attributes, parent):
+        #: The name of the span.
+        self.name = name
+        #: The :obj:`dict` of attributes attached to the span.
+        self.attributes = attributes
+        #: The enclosing :class:`Span`, or :obj:`None`.
+        self.parent = parent
+        #: When the span started and ended (as returned by :func:`time.time`).
+        self.start = time.time()
+        self.end = None
+        #: The exception that ended the span, if any.
+        self.error = None
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return '<Span %s %r>' % (self.name, self.attributes)
+
+
+class InMemoryTracer(Tracer):
+    """
+    A tracer that records all spans in memory, mainly intended for tests.
+    """
+
+    def __init__(self):
+        #: All finished :class:`spans <Span>`, in the order that they ended.
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, attributes):
+        stack = self._local.__dict__.setdefault('stack', [])
+        span = Span(name, dict(attributes), stack[-1] if stack else None)
+        stack.append(span)
+
+        try:
+            yield span
+        except:
+            span.error = sys.exc_info()[1]
+            raise
+        finally:
+            stack.pop()
+            span.end = time.time()
+            with self._lock:
+                self.spans.append(span)
+
+    def children(self, span):
+        """
+        :returns: The spans started directly within span, in the order that they ended
+        """
+
+        return [child for child in self.spans if child.parent is span]
+
+    def clear(self):
+        """
+        Forgets all recorded spans.
+        """
+
+        with self._lock:
+            del self.spans[:]
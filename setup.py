@@ -3,6 +3,8 @@ from setuptools.command.test import test as TestCommand
 
 from os import path
 
+import sys
+
 
 class PyTest(TestCommand):
     def finalize_options(self):
@@ -25,13 +27,13 @@ setup(
     author_email='teo@nullable.se',
     description='An API microframework based on the idea of that the UI is just yet another API endpoint',
     long_description=open(path.join(path.dirname(path.abspath(__file__)), 'README.rst')).read(),
-    packages=['flask_pushrod', 'flask_pushrod.renderers'],
+    packages=['flask_pushrod', 'flask_pushrod.renderers', 'flask_pushrod.parsers'],
     zip_safe=False,
     platforms='any',
     install_requires=[
         'Werkzeug>=0.7',
         'Flask>=0.9',
-    ],
+    ] + (['ordereddict'] if sys.version_info < (2, 7) else []),
     tests_require=[
         'pytest>=2.2.4',
         'nose>=1.2.1',